@@ -4,7 +4,7 @@
 # License LGPL-3.0 or later (http://www.gnu.org/licenses/lgpl).
 {
     "name": "Loan Management",
-    "version": "8.0.2.3.0",
+    "version": "8.0.2.4.0",
     "category": "Loan & Saving",
     "website": "https://simetri-sinergi.id",
     "author": "OpenSynergy Indonesia, PT. Simetri Sinergi Indonesia",
@@ -13,7 +13,6 @@
     "installable": True,
     "depends": [
         "account_accountant",
-        "base_action_rule",
         "loan_saving_core",
         "base_sequence_configurator",
         "base_workflow_policy",
@@ -28,8 +27,6 @@
         "data/base_sequence_configurator_data.xml",
         "data/base_workflow_policy_data.xml",
         "data/ir_filter_data.xml",
-        "data/ir_actions_server_data.xml",
-        "data/base_action_rule_data.xml",
         "data/ir_cron_data.xml",
         "menu.xml",
         "wizard/realize_interest_views.xml",
@@ -43,5 +40,8 @@
         "views/loan_in_payment_schedule_views.xml",
         "views/loan_out_payment_schedule_views.xml",
         "views/loan_config_setting_views.xml",
+        "views/loan_interest_realization_watermark_views.xml",
+        "views/loan_operation_stat_views.xml",
+        "views/loan_job_views.xml",
     ],
 }
@@ -0,0 +1,220 @@
+# -*- coding: utf-8 -*-
+# Copyright 2019 OpenSynergy Indonesia
+# License LGPL-3.0 or later (http://www.gnu.org/licenses/lgpl).
+"""Compare the column amortization engine with the per-row loops.
+
+Every row of the engine is checked against the loops, the script exits
+with status 1 when one differs. Run without a server::
+
+    python loan_core/benchmarks/bench_compute_interest.py --loans 10000 --periods 360
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime
+
+from dateutil import relativedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "models"))
+
+import amortization  # noqa: E402
+
+
+def legacy_flat(loan_amount, interest, period, first_payment_date):
+    result = []
+    principle_amount = loan_amount / period
+    interest_amount = (loan_amount * (interest / 100.00)) / 12.0
+    next_payment_date = datetime.strptime(first_payment_date, "%Y-%m-%d")
+    for _loan_period in range(1, period + 1):
+        res = {
+            "schedule_date": next_payment_date.strftime("%Y-%m-%d"),
+            "principle_amount": principle_amount,
+            "interest_amount": interest_amount,
+        }
+        result.append(res)
+        next_payment_date = next_payment_date + relativedelta.relativedelta(months=+1)
+    return result
+
+
+def legacy_effective(loan_amount, interest, period, first_payment_date):
+    result = []
+    principle_amount = loan_amount / float(period)
+    interest_dec = interest / 100.00
+    for loan_period in range(1, period + 1):
+        period_before = loan_period - 1
+        interest_amount = (
+            (loan_amount - (period_before * principle_amount)) * interest_dec / 12.00
+        )
+        res = {
+            "schedule_date": first_payment_date,
+            "principle_amount": principle_amount,
+            "interest_amount": interest_amount,
+        }
+        result.append(res)
+    return result
+
+
+def legacy_anuity(loan_amount, interest, period, first_payment_date):
+    result = []
+    interest_decimal = interest / 100.00
+    total_principle_amount = 0.0
+    fixed_principle_amount = loan_amount * (
+        (interest_decimal / 12.0)
+        / (1.0 - (1.0 + (interest_decimal / 12.00)) ** -float(period))
+    )
+    for _loan_period in range(1, period + 1):
+        interest_amount = (
+            (loan_amount - total_principle_amount) * interest_decimal / 12.00
+        )
+        principle_amount = fixed_principle_amount - interest_amount
+        res = {
+            "schedule_date": first_payment_date,
+            "principle_amount": principle_amount,
+            "interest_amount": interest_amount,
+        }
+        result.append(res)
+        total_principle_amount += principle_amount
+    return result
+
+
+LEGACY = {
+    "flat": legacy_flat,
+    "effective": legacy_effective,
+    "anuity": legacy_anuity,
+}
+
+
+def build_portfolio(loans, periods, seed=0):
+    rnd = random.Random(seed)
+    methods = sorted(LEGACY)
+    portfolio = {
+        "loan_amounts": [],
+        "interests": [],
+        "periods": [],
+        "first_payment_dates": [],
+        "interest_methods": [],
+    }
+    for _loan in range(loans):
+        portfolio["loan_amounts"].append(float(rnd.randint(10, 5000) * 1000))
+        portfolio["interests"].append(rnd.choice([6.0, 7.5, 9.0, 12.0]))
+        portfolio["periods"].append(periods)
+        portfolio["first_payment_dates"].append(
+            "2021-%02d-%02d" % (rnd.randint(1, 12), rnd.choice([1, 15, 25]))
+        )
+        portfolio["interest_methods"].append(rnd.choice(methods))
+    return portfolio
+
+
+def run_legacy(portfolio):
+    result = []
+    for loan_amount, interest, period, first_payment_date, method in zip(
+        portfolio["loan_amounts"],
+        portfolio["interests"],
+        portfolio["periods"],
+        portfolio["first_payment_dates"],
+        portfolio["interest_methods"],
+    ):
+        result.append(LEGACY[method](loan_amount, interest, period, first_payment_date))
+    return result
+
+
+def run_engine(portfolio):
+    return amortization.compute_schedules(
+        portfolio["loan_amounts"],
+        portfolio["interests"],
+        portfolio["periods"],
+        portfolio["first_payment_dates"],
+        portfolio["interest_methods"],
+    )
+
+
+def expected_dates(first_payment_date, period):
+    """Monthly offsets from the first payment date, the dates every
+    method of the engine is expected to produce
+    """
+    dt_first = datetime.strptime(first_payment_date, "%Y-%m-%d")
+    return [
+        (dt_first + relativedelta.relativedelta(months=offset)).strftime("%Y-%m-%d")
+        for offset in range(period)
+    ]
+
+
+def check_rows(portfolio, legacy, engine, tolerance=1e-6):
+    """Compare every row of the engine with the row of the loops
+
+    Returns the differences found. Amounts have to match the loops.
+    Dates have to match expected_dates: the loops stamp effective and
+    anuity rows with the first payment date and let flat dates drift
+    after a month-end clamp, which the engine fixes on purpose.
+    """
+    differences = []
+    for index, (rows, columns) in enumerate(zip(legacy, engine)):
+        engine_rows = amortization.columns_to_rows(columns)
+        if len(engine_rows) != len(rows):
+            differences.append(
+                "loan %d: %d rows instead of %d" % (index, len(engine_rows), len(rows))
+            )
+            continue
+        dates = expected_dates(
+            portfolio["first_payment_dates"][index], portfolio["periods"][index]
+        )
+        for row_index, (row, engine_row, schedule_date) in enumerate(
+            zip(rows, engine_rows, dates)
+        ):
+            if sorted(engine_row) != sorted(row):
+                differences.append(
+                    "loan %d row %d: columns %s instead of %s"
+                    % (index, row_index, sorted(engine_row), sorted(row))
+                )
+                continue
+            for column in ("principle_amount", "interest_amount"):
+                if abs(engine_row[column] - row[column]) > tolerance:
+                    differences.append(
+                        "loan %d row %d: %s %r instead of %r"
+                        % (index, row_index, column, engine_row[column], row[column])
+                    )
+            if engine_row["schedule_date"] != schedule_date:
+                differences.append(
+                    "loan %d row %d: schedule_date %s instead of %s"
+                    % (index, row_index, engine_row["schedule_date"], schedule_date)
+                )
+    return differences
+
+
+def report(message):
+    sys.stdout.write("%s\n" % message)
+
+
+def timed(function, *args):
+    start = time.time()
+    result = function(*args)
+    return time.time() - start, result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--loans", type=int, default=10000)
+    parser.add_argument("--periods", type=int, default=360)
+    args = parser.parse_args(argv)
+
+    portfolio = build_portfolio(args.loans, args.periods)
+    legacy_time, legacy = timed(run_legacy, portfolio)
+    engine_time, engine = timed(run_engine, portfolio)
+
+    rows = args.loans * args.periods
+    report("loans: %d, periods: %d, rows: %d" % (args.loans, args.periods, rows))
+    report("legacy loops: %.3fs (%.0f rows/s)" % (legacy_time, rows / legacy_time))
+    report("column engine: %.3fs (%.0f rows/s)" % (engine_time, rows / engine_time))
+    report("speedup: %.1fx" % (legacy_time / engine_time))
+    differences = check_rows(portfolio, legacy, engine)
+    for difference in differences[:20]:
+        report("DIFFERENCE: %s" % difference)
+    report("rows match: %s (%d differences)" % (not differences, len(differences)))
+    return 1 if differences else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
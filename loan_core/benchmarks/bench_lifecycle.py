@@ -0,0 +1,335 @@
+# -*- coding: utf-8 -*-
+# Copyright 2019 OpenSynergy Indonesia
+# License LGPL-3.0 or later (http://www.gnu.org/licenses/lgpl).
+"""End-to-end loan life cycle load test.
+
+Seeds accounts, journals, fiscal years, loan types and partners on a
+scratch database where ``loan_core`` is installed, then drives loans
+through the whole life cycle in bulk::
+
+    create -> action_compute_payment -> workflow_action_confirm
+    -> validate_tier / action_approve -> realization reconcile
+    -> realize_interest_income cron -> payment reconcile
+    -> workflow_action_done
+
+Loans are realized ``--periods`` + 1 months ago, so every schedule is
+due when the interest cron runs.
+
+Every stage is committed on its own and reports per-loan latency
+percentiles, SQL query count and rows written. The interest cron runs
+once over the whole portfolio and only reports its total time. Runs
+with the same sizes can be compared, the script exits with status 1
+when a stage is slower than the baseline by more than the threshold::
+
+    python loan_core/benchmarks/bench_lifecycle.py -c odoo.conf -d bench \\
+        --loans 500 --types 5 --partners 50 --periods 12 --output run.json
+    python loan_core/benchmarks/bench_lifecycle.py -c odoo.conf -d bench \\
+        --loans 500 --types 5 --partners 50 --periods 12 \\
+        --baseline run.json --threshold 0.2
+
+Do not run it on a production database, the seeded data is committed.
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+from datetime import date
+
+from dateutil import relativedelta
+
+import openerp
+from openerp import SUPERUSER_ID, api
+
+
+def report(message):
+    sys.stdout.write("%s\n" % message)
+
+
+def rows_written(cr):
+    # Per transaction counters, every stage runs in its own transaction
+    cr.execute(
+        "SELECT COALESCE(SUM(n_tup_ins + n_tup_upd + n_tup_del), 0) "
+        "FROM pg_stat_xact_user_tables"
+    )
+    return cr.fetchone()[0]
+
+
+def percentile(values, ratio):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(ratio * (len(values) - 1))))
+    return values[index]
+
+
+def run_batch_stage(env, name, count, action):
+    """Call ``action`` once for ``count`` loans, commit and return the
+    stats
+    """
+    cr = env.cr
+    query_start = cr.sql_log_count
+    row_start = rows_written(cr)
+    time_start = time.time()
+    action()
+    elapsed = time.time() - time_start
+    queries = cr.sql_log_count - query_start
+    rows = rows_written(cr) - row_start
+    cr.commit()
+    env.invalidate_all()
+    stat = {
+        "count": count,
+        "elapsed": elapsed,
+        "throughput": count / elapsed if elapsed else 0.0,
+        "queries": queries,
+        "queries_per_record": queries / float(count) if count else 0.0,
+        "rows_written": rows,
+    }
+    report(
+        "%-22s %6d in %8.3fs  %7.1f q/rec  %8d rows"
+        % (name, count, elapsed, stat["queries_per_record"], rows)
+    )
+    return stat
+
+
+def run_stage(env, name, records, action):
+    """Apply ``action`` on every record, commit and return the stats"""
+    cr = env.cr
+    query_start = cr.sql_log_count
+    row_start = rows_written(cr)
+    latencies = []
+    time_start = time.time()
+    for record in records:
+        start = time.time()
+        action(record)
+        latencies.append(time.time() - start)
+    elapsed = time.time() - time_start
+    queries = cr.sql_log_count - query_start
+    rows = rows_written(cr) - row_start
+    cr.commit()
+    env.invalidate_all()
+    count = len(latencies)
+    stat = {
+        "count": count,
+        "elapsed": elapsed,
+        "throughput": count / elapsed if elapsed else 0.0,
+        "p50": percentile(latencies, 0.50),
+        "p90": percentile(latencies, 0.90),
+        "p99": percentile(latencies, 0.99),
+        "max": max(latencies) if latencies else 0.0,
+        "queries": queries,
+        "queries_per_record": queries / float(count) if count else 0.0,
+        "rows_written": rows,
+    }
+    report(
+        "%-22s %6d in %8.3fs  p50 %7.1fms  p90 %7.1fms  p99 %7.1fms  "
+        "%7.1f q/rec  %8d rows"
+        % (
+            name,
+            count,
+            elapsed,
+            stat["p50"] * 1000,
+            stat["p90"] * 1000,
+            stat["p99"] * 1000,
+            stat["queries_per_record"],
+            rows,
+        )
+    )
+    return stat
+
+
+def compare(results, baseline, threshold):
+    regressions = []
+    for stage, data in sorted(results.items()):
+        reference = baseline.get(stage)
+        if not reference:
+            continue
+        floor = reference["throughput"] * (1.0 - threshold)
+        if data["throughput"] < floor:
+            regressions.append(
+                "%s: %.1f loans/s, baseline %.1f loans/s"
+                % (stage, data["throughput"], reference["throughput"])
+            )
+    return regressions
+
+
+class Lifecycle(object):
+    def __init__(self, env, seeder, args):
+        self.env = env
+        self.seeder = seeder
+        self.args = args
+        self.obj_loan = seeder.obj_loan
+        self.today = date.today()
+        self.date_realization = self.today - relativedelta.relativedelta(
+            months=args.periods + 1
+        )
+        self.rnd = random.Random(args.seed)
+
+    def create(self, index):
+        loan_type = self.seeder.loan_types[index % len(self.seeder.loan_types)]
+        partner = self.seeder.partners[index % len(self.seeder.partners)]
+        return self.seeder.create_loan(
+            loan_type,
+            partner,
+            float(self.rnd.randint(10, 1000) * 1000),
+            self.args.periods,
+            self.date_realization + relativedelta.relativedelta(months=1),
+            self.date_realization,
+        ).id
+
+    def compute_payment(self, loan):
+        loan.action_compute_payment()
+
+    def approve(self, loan):
+        self.seeder.approve(loan)
+
+    def reconcile_realization(self, loan):
+        self.seeder.pay(loan, [loan.move_line_header_id], self.date_realization)
+
+    def realize_interest(self):
+        obj_schedule = self.env[
+            self.obj_loan._fields["payment_schedule_ids"].comodel_name
+        ]
+        obj_schedule.realize_interest_income(
+            commit=False,
+            company_ids=[self.seeder.company.id],
+        )
+
+    def reconcile_payment(self, loan):
+        lines = []
+        for schedule in loan.payment_schedule_ids:
+            lines.append(schedule.principle_move_line_id)
+            if schedule.interest_move_line_id:
+                lines.append(schedule.interest_move_line_id)
+        self.seeder.pay(loan, lines, self.today)
+
+    def done(self, loan):
+        # Reconciling the last installment already completes the loan
+        if loan.state == "active":
+            loan.workflow_action_done()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("-c", "--config", dest="config")
+    parser.add_argument("-d", "--database", required=True)
+    parser.add_argument("--direction", choices=["in", "out"], default="out")
+    parser.add_argument("--loans", type=int, default=100)
+    parser.add_argument("--types", type=int, default=3)
+    parser.add_argument("--partners", type=int, default=20)
+    parser.add_argument("--periods", type=int, default=12)
+    parser.add_argument("--maximum-loan-amount", type=float, default=1000000.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="JSON file the results are written to")
+    parser.add_argument("--baseline", help="JSON file of a previous run")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.2,
+        help="allowed throughput loss against the baseline (0.2 = 20%%)",
+    )
+    args = parser.parse_args(argv)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+        sizes = ("loans", "types", "partners", "periods", "direction")
+        for size in sizes:
+            if baseline[size] != getattr(args, size):
+                parser.error(
+                    "baseline %s is %s, not %s"
+                    % (size, baseline[size], getattr(args, size))
+                )
+
+    config_args = ["-d", args.database]
+    if args.config:
+        config_args += ["-c", args.config]
+    openerp.tools.config.parse_config(config_args)
+    registry = openerp.modules.registry.RegistryManager.get(args.database)
+    # Importable once the registry has loaded the addon
+    from openerp.addons.loan_core.tests.common import LoanSeeder
+
+    tag = "B%s" % int(time.time() % 100000)
+    results = {}
+    with api.Environment.manage():
+        with registry.cursor() as cr:
+            env = api.Environment(cr, SUPERUSER_ID, {})
+            seeder = LoanSeeder(env, tag, args.direction)
+            today = date.today()
+            seeder.seed_fiscal_years(
+                today - relativedelta.relativedelta(months=args.periods + 1),
+                today,
+            )
+            seeder.seed_accounting()
+            seeder.seed_loan_types(args.types, args.maximum_loan_amount, args.periods)
+            seeder.seed_partners(args.partners)
+            cr.commit()
+
+            lifecycle = Lifecycle(env, seeder, args)
+            loan_ids = []
+            results["create"] = run_stage(
+                env,
+                "create",
+                range(args.loans),
+                lambda index: loan_ids.append(lifecycle.create(index)),
+            )
+
+            def run_loan_stages(stage_actions):
+                for stage, action in stage_actions:
+                    loans = lifecycle.obj_loan.browse(loan_ids)
+                    results[stage] = run_stage(env, stage, loans, action)
+
+            run_loan_stages(
+                [
+                    ("compute_payment", lifecycle.compute_payment),
+                    ("confirm", lambda loan: loan.workflow_action_confirm()),
+                    ("approve", lifecycle.approve),
+                    ("realization_reconcile", lifecycle.reconcile_realization),
+                ]
+            )
+            results["interest_cron"] = run_batch_stage(
+                env, "interest_cron", len(loan_ids), lifecycle.realize_interest
+            )
+            run_loan_stages(
+                [
+                    ("payment_reconcile", lifecycle.reconcile_payment),
+                    ("done", lifecycle.done),
+                ]
+            )
+
+            loans = lifecycle.obj_loan.browse(loan_ids)
+            states = {}
+            for loan in loans:
+                states[loan.state] = states.get(loan.state, 0) + 1
+            report("final states: %s" % states)
+
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(
+                {
+                    "loans": args.loans,
+                    "types": args.types,
+                    "partners": args.partners,
+                    "periods": args.periods,
+                    "direction": args.direction,
+                    "stages": results,
+                },
+                output,
+                indent=2,
+                sort_keys=True,
+            )
+
+    failures = []
+    if baseline:
+        failures = compare(results, baseline["stages"], args.threshold)
+    for failure in failures:
+        report("REGRESSION: %s" % failure)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
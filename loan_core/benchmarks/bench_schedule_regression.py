@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+# Copyright 2019 OpenSynergy Indonesia
+# License LGPL-3.0 or later (http://www.gnu.org/licenses/lgpl).
+"""Schedule generation regression suite.
+
+Times the amortization engine and the pure Python schedule helpers at
+several portfolio sizes, records the throughput to a JSON file and
+exits with status 1 when a stage is slower than the baseline by more
+than the threshold, or when a row of the engine differs from the
+per-row loops::
+
+    python loan_core/benchmarks/bench_schedule_regression.py \\
+        --output schedule.json
+    python loan_core/benchmarks/bench_schedule_regression.py \\
+        --baseline schedule.json --threshold 0.2
+
+Stages:
+
+* ``generate``: column schedules for the whole portfolio
+* ``rows``: conversion of the columns into schedule row dictionaries
+* ``split``: position of the one year boundary in every schedule
+* ``due``: position of a run date in every schedule
+
+No stage touches the database. ``_compute_payment``,
+``_create_realization_move`` and ``realize_interest_income`` are
+measured against a real database by ``bench_lifecycle.py``.
+"""
+
+import argparse
+import bisect
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "models"))
+
+import amortization  # noqa: E402
+from bench_compute_interest import (  # noqa: E402
+    build_portfolio,
+    check_rows,
+    report,
+    run_legacy,
+)
+
+STAGES = ("generate", "rows", "split", "due")
+
+
+def stage_generate(portfolio, schedules):
+    return amortization.compute_schedules(
+        portfolio["loan_amounts"],
+        portfolio["interests"],
+        portfolio["periods"],
+        portfolio["first_payment_dates"],
+        portfolio["interest_methods"],
+    )
+
+
+def stage_rows(portfolio, schedules):
+    result = []
+    for loan_id, columns in enumerate(schedules):
+        for row in amortization.columns_to_rows(columns):
+            row["loan_id"] = loan_id
+            result.append(row)
+    return result
+
+
+def stage_split(portfolio, schedules):
+    result = []
+    for first_payment_date, columns in zip(portfolio["first_payment_dates"], schedules):
+        date_as_of = datetime.strptime(first_payment_date, "%Y-%m-%d")
+        boundary = (date_as_of + timedelta(days=365)).strftime("%Y-%m-%d")
+        result.append(bisect.bisect_right(columns["schedule_date"], boundary))
+    return result
+
+
+def stage_due(portfolio, schedules, date_run="2022-06-30"):
+    result = []
+    for columns in schedules:
+        result.append(bisect.bisect_right(columns["schedule_date"], date_run))
+    return result
+
+
+STAGE_FUNCTIONS = {
+    "generate": stage_generate,
+    "rows": stage_rows,
+    "split": stage_split,
+    "due": stage_due,
+}
+
+
+def run_size(loans, periods, repeat):
+    portfolio = build_portfolio(loans, periods)
+    schedules = stage_generate(portfolio, None)
+    rows = loans * periods
+    result = {}
+    for stage in STAGES:
+        best = None
+        for _run in range(repeat):
+            start = time.time()
+            STAGE_FUNCTIONS[stage](portfolio, schedules)
+            elapsed = time.time() - start
+            if best is None or elapsed < best:
+                best = elapsed
+        result[stage] = {
+            "elapsed": best,
+            "rows_per_second": rows / max(best, 1e-9),
+        }
+    return result, check_rows(portfolio, run_legacy(portfolio), schedules)
+
+
+def compare(results, baseline, threshold):
+    regressions = []
+    for size, stages in sorted(results.items()):
+        for stage, data in sorted(stages.items()):
+            reference = baseline.get(size, {}).get(stage)
+            if not reference:
+                continue
+            floor = reference["rows_per_second"] * (1.0 - threshold)
+            if data["rows_per_second"] < floor:
+                regressions.append(
+                    "%s loans %s: %.0f rows/s, baseline %.0f rows/s"
+                    % (
+                        size,
+                        stage,
+                        data["rows_per_second"],
+                        reference["rows_per_second"],
+                    )
+                )
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--sizes", default="100,1000,10000")
+    parser.add_argument("--periods", type=int, default=120)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="JSON file the results are written to")
+    parser.add_argument("--baseline", help="JSON file of a previous run")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.2,
+        help="allowed throughput loss against the baseline (0.2 = 20%%)",
+    )
+    args = parser.parse_args(argv)
+
+    failures = []
+    results = {}
+    for size in [int(size) for size in args.sizes.split(",")]:
+        stages, differences = run_size(size, args.periods, args.repeat)
+        results[str(size)] = stages
+        for stage in STAGES:
+            report(
+                "%6d loans %-8s %.3fs (%.0f rows/s)"
+                % (
+                    size,
+                    stage,
+                    stages[stage]["elapsed"],
+                    stages[stage]["rows_per_second"],
+                )
+            )
+        for difference in differences[:20]:
+            failures.append("%s loans: %s" % (size, difference))
+
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(
+                {"periods": args.periods, "results": results},
+                output,
+                indent=2,
+                sort_keys=True,
+            )
+
+    if args.baseline:
+        with open(args.baseline) as baseline:
+            failures += compare(results, json.load(baseline)["results"], args.threshold)
+
+    for failure in failures:
+        report("REGRESSION: %s" % failure)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+# Copyright 2019 OpenSynergy Indonesia
+# License LGPL-3.0 or later (http://www.gnu.org/licenses/lgpl).
+
+from openerp import SUPERUSER_ID, api
+from openupgradelib import openupgrade
+
+
+def migrate_loan_move_line_link(env, loan_model, schedule_model):
+    loan_table = loan_model.replace(".", "_")
+    schedule_table = schedule_model.replace(".", "_")
+    openupgrade.logged_query(
+        env.cr,
+        """
+        INSERT INTO loan_move_line_link
+        (move_line_id, res_model, res_id, role)
+        SELECT move_line_header_id, %s, id, 'header'
+        FROM """
+        + loan_table
+        + """
+        WHERE move_line_header_id IS NOT NULL;
+        """,
+        (loan_model,),
+    )
+    openupgrade.logged_query(
+        env.cr,
+        """
+        INSERT INTO loan_move_line_link
+        (move_line_id, res_model, res_id, role)
+        SELECT principle_move_line_id, %s, id, 'principle'
+        FROM """
+        + schedule_table
+        + """
+        WHERE principle_move_line_id IS NOT NULL
+        UNION ALL
+        SELECT old_principle_move_line_id, %s, id, 'old_principle'
+        FROM """
+        + schedule_table
+        + """
+        WHERE old_principle_move_line_id IS NOT NULL
+        UNION ALL
+        SELECT interest_move_line_id, %s, id, 'interest'
+        FROM """
+        + schedule_table
+        + """
+        WHERE interest_move_line_id IS NOT NULL;
+        """,
+        (schedule_model, schedule_model, schedule_model),
+    )
+    openupgrade.logged_query(
+        env.cr,
+        """
+        INSERT INTO loan_move_line_link
+        (move_line_id, res_model, res_id, role)
+        SELECT target.id, %s, a.id, 'long_term'
+        FROM """
+        + schedule_table
+        + """ AS a
+        JOIN account_move_line AS new ON new.id = a.principle_move_line_id
+        JOIN account_move_line AS old ON old.id = a.old_principle_move_line_id
+        JOIN account_move_line AS target
+            ON target.move_id = new.move_id
+            AND target.account_id = old.account_id
+        WHERE a.old_principle_move_line_id IS NOT NULL;
+        """,
+        (schedule_model,),
+    )
+
+
+@openupgrade.migrate()
+def migrate(cr, version):
+    env = api.Environment(cr, SUPERUSER_ID, {})
+    migrate_loan_move_line_link(env, "loan.in", "loan.in_payment_schedule")
+    migrate_loan_move_line_link(env, "loan.out", "loan.out_payment_schedule")
@@ -7,8 +7,16 @@ from . import (
     loan_type,
     loan_common,
     loan_payment_schedule_common,
+    loan_interest_realization_watermark,
+    loan_move_line_link,
+    loan_operation_stat,
+    loan_job,
     loan_in,
     loan_out,
     res_company,
+    account_move_line,
+    account_period,
+    ir_property,
+    base_workflow_policy_line,
     res_config,
 )
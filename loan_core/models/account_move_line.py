@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+# Copyright 2019 OpenSynergy Indonesia
+# License LGPL-3.0 or later (http://www.gnu.org/licenses/lgpl).
+
+from openerp import api, models
+
+
+class AccountMoveLine(models.Model):
+    _inherit = "account.move.line"
+
+    @api.multi
+    def write(self, vals, check=True, update_check=True):
+        _super = super(AccountMoveLine, self)
+        result = _super.write(vals, check=check, update_check=update_check)
+        if vals.get("reconcile_id"):
+            self._update_loan_from_reconciliation()
+        return result
+
+    @api.multi
+    def _update_loan_from_reconciliation(self):
+        obj_link = self.env["loan.move_line_link"]
+        links = obj_link.search([("move_line_id", "in", self.ids)])
+        if links:
+            links._update_loan_from_reconciliation()
@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+# Copyright 2019 OpenSynergy Indonesia
+# License LGPL-3.0 or later (http://www.gnu.org/licenses/lgpl).
+
+from openerp import api, fields, models, tools
+
+
+class AccountPeriod(models.Model):
+    _inherit = "account.period"
+
+    @api.model
+    def create(self, values):
+        result = super(AccountPeriod, self).create(values)
+        self.clear_caches()
+        return result
+
+    @api.multi
+    def write(self, values):
+        result = super(AccountPeriod, self).write(values)
+        self.clear_caches()
+        return result
+
+    @api.multi
+    def unlink(self):
+        result = super(AccountPeriod, self).unlink()
+        self.clear_caches()
+        return result
+
+    @api.model
+    def _find_loan_period(self, date, company):
+        """Cached equivalent of find() for loan entries of a company"""
+        if not date:
+            date = fields.Date.context_today(self)
+        elif hasattr(date, "strftime"):
+            date = fields.Date.to_string(date)
+        return self.browse(self._get_loan_period_id(date, company.id))
+
+    @api.model
+    @tools.ormcache(skiparg=1)
+    def _get_loan_period_id(self, date, company_id):
+        return self.with_context(company_id=company_id).find(date)[0].id
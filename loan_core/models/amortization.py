@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+# Copyright 2019 OpenSynergy Indonesia
+# License LGPL-3.0 or later (http://www.gnu.org/licenses/lgpl).
+"""Column based amortization engine.
+
+This module does not depend on the ORM so it can be used (and timed)
+outside of a running server. Every schedule is returned as a dict of
+columns (``schedule_date``, ``principle_amount``, ``interest_amount``)
+instead of a list of per-period dicts.
+"""
+
+import calendar
+from datetime import datetime
+
+SCHEDULE_COLUMNS = ("schedule_date", "principle_amount", "interest_amount")
+
+
+class DateColumnCache(object):
+    """Monthly schedule dates shared between loans of a batch.
+
+    Loans of a portfolio usually share a few first payment dates, so the
+    date column is built once per first payment date and sliced for
+    every loan.
+    """
+
+    def __init__(self):
+        self._columns = {}
+
+    def get(self, first_payment_date, period):
+        column = self._columns.get(first_payment_date)
+        if column is None or len(column) < period:
+            column = monthly_dates(first_payment_date, period)
+            self._columns[first_payment_date] = column
+        return column[:period]
+
+
+def monthly_dates(first_payment_date, period):
+    """Return ``period`` monthly dates starting at ``first_payment_date``
+
+    Every date is an offset from the first payment date, so the day of
+    month is only clamped for short months and never drifts.
+    """
+    dt_first = datetime.strptime(first_payment_date, "%Y-%m-%d")
+    day = dt_first.day
+    base = dt_first.year * 12 + dt_first.month - 1
+    result = []
+    for offset in range(period):
+        year, month = divmod(base + offset, 12)
+        month += 1
+        if day > 28:
+            month_day = min(day, calendar.monthrange(year, month)[1])
+        else:
+            month_day = day
+        result.append("%04d-%02d-%02d" % (year, month, month_day))
+    return result
+
+
+def _flat_columns(loan_amount, interest, period):
+    principle_amount = loan_amount / period
+    interest_amount = (loan_amount * (interest / 100.00)) / 12.0
+    return [principle_amount] * period, [interest_amount] * period
+
+
+def _effective_columns(loan_amount, interest, period):
+    principle_amount = loan_amount / float(period)
+    monthly_rate = interest / 100.00 / 12.00
+    interest_amounts = [
+        (loan_amount - (period_before * principle_amount)) * monthly_rate
+        for period_before in range(period)
+    ]
+    return [principle_amount] * period, interest_amounts
+
+
+def _anuity_columns(loan_amount, interest, period, growth_cache):
+    # The principle part of an anuity installment is a geometric series:
+    # principle_k = (installment - loan_amount * rate) * (1 + rate) ** k
+    monthly_rate = interest / 100.00 / 12.00
+    key = (monthly_rate, period)
+    growths = growth_cache.get(key)
+    if growths is None:
+        growth = 1.0 + monthly_rate
+        growths = [growth**period_before for period_before in range(period)]
+        growth_cache[key] = growths
+    installment = loan_amount * (
+        monthly_rate / (1.0 - (1.0 + monthly_rate) ** -float(period))
+    )
+    first_principle_amount = installment - (loan_amount * monthly_rate)
+    principle_amounts = [first_principle_amount * growth for growth in growths]
+    interest_amounts = [
+        installment - principle_amount for principle_amount in principle_amounts
+    ]
+    return principle_amounts, interest_amounts
+
+
+def compute_schedules(
+    loan_amounts, interests, periods, first_payment_dates, interest_methods
+):
+    """Compute payment schedules for a batch of loans
+
+    All arguments are sequences of the same length, one item per loan.
+    Returns a list with, for every loan, a dict of columns keyed by
+    ``SCHEDULE_COLUMNS``, or ``None`` when the interest method is unknown.
+    """
+    date_cache = DateColumnCache()
+    growth_cache = {}
+    result = []
+    for loan_amount, interest, period, first_payment_date, interest_method in zip(
+        loan_amounts, interests, periods, first_payment_dates, interest_methods
+    ):
+        if interest_method == "flat":
+            principle_amounts, interest_amounts = _flat_columns(
+                loan_amount, interest, period
+            )
+        elif interest_method == "effective":
+            principle_amounts, interest_amounts = _effective_columns(
+                loan_amount, interest, period
+            )
+        elif interest_method == "anuity":
+            principle_amounts, interest_amounts = _anuity_columns(
+                loan_amount, interest, period, growth_cache
+            )
+        else:
+            result.append(None)
+            continue
+        result.append(
+            {
+                "schedule_date": date_cache.get(first_payment_date, period),
+                "principle_amount": principle_amounts,
+                "interest_amount": interest_amounts,
+            }
+        )
+    return result
+
+
+def columns_to_rows(columns):
+    """Convert a column schedule into the list of per-period dicts"""
+    if columns is None:
+        return None
+    return [
+        dict(zip(SCHEDULE_COLUMNS, row))
+        for row in zip(*[columns[column] for column in SCHEDULE_COLUMNS])
+    ]
@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+# Copyright 2019 OpenSynergy Indonesia
+# License LGPL-3.0 or later (http://www.gnu.org/licenses/lgpl).
+
+from openerp import api, models
+
+
+class BaseWorkflowPolicyLine(models.Model):
+    _inherit = "base.workflow_policy_line"
+
+    # Loan policies are cached by loan.common._get_policy_values
+
+    @api.model
+    def create(self, values):
+        result = super(BaseWorkflowPolicyLine, self).create(values)
+        self.env["loan.type"]._clear_loan_caches()
+        return result
+
+    @api.multi
+    def write(self, values):
+        result = super(BaseWorkflowPolicyLine, self).write(values)
+        self.env["loan.type"]._clear_loan_caches()
+        return result
+
+    @api.multi
+    def unlink(self):
+        result = super(BaseWorkflowPolicyLine, self).unlink()
+        self.env["loan.type"]._clear_loan_caches()
+        return result
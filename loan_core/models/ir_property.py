@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+# Copyright 2019 OpenSynergy Indonesia
+# License LGPL-3.0 or later (http://www.gnu.org/licenses/lgpl).
+
+from openerp import api, models
+
+from .loan_type import PROFILE_FIELD_NAMES
+
+
+class IrProperty(models.Model):
+    _inherit = "ir.property"
+
+    # Company dependent values of loan types are cached by
+    # loan.type._get_accounting_profile
+
+    @api.model
+    def create(self, values):
+        result = super(IrProperty, self).create(values)
+        if result._filter_loan_type_profile():
+            self.env["loan.type"].clear_caches()
+        return result
+
+    @api.multi
+    def write(self, values):
+        properties = self._filter_loan_type_profile()
+        result = super(IrProperty, self).write(values)
+        if properties or self._filter_loan_type_profile():
+            self.env["loan.type"].clear_caches()
+        return result
+
+    @api.multi
+    def unlink(self):
+        properties = self._filter_loan_type_profile()
+        result = super(IrProperty, self).unlink()
+        if properties:
+            self.env["loan.type"].clear_caches()
+        return result
+
+    @api.multi
+    def _filter_loan_type_profile(self):
+        return self.filtered(
+            lambda r: r.fields_id.model == "loan.type"
+            and r.fields_id.name in PROFILE_FIELD_NAMES
+        )
@@ -2,10 +2,22 @@
 # Copyright 2019 OpenSynergy Indonesia
 # License LGPL-3.0 or later (http://www.gnu.org/licenses/lgpl).
 
-from openerp import api, fields, models
+import bisect
+import logging
+import time
+from datetime import timedelta
+
+from openerp import SUPERUSER_ID, api, fields, models, tools
 from openerp.exceptions import Warning as UserError
+from openerp.tools import float_is_zero, float_round
+from openerp.tools.safe_eval import safe_eval
 from openerp.tools.translate import _
 
+from . import amortization
+from .loan_operation_stat import instrumented
+
+_logger = logging.getLogger(__name__)
+
 DATE_SELECTION = map(lambda x: [x, str(x)], range(1, 32))
 
 
@@ -33,13 +45,53 @@ class LoanCommon(models.AbstractModel):
         "payment_schedule_ids.interest_amount",
     )
     def _compute_total(self):
+        totals = self._get_schedule_totals()
         for loan in self:
-            loan.total_principle_amount = 0.0
-            loan.total_interest_amount = 0.0
-            if loan.payment_schedule_ids:
-                for schedule in loan.payment_schedule_ids:
-                    loan.total_principle_amount += schedule.principle_amount
-                    loan.total_interest_amount += schedule.interest_amount
+            principle_amount, interest_amount = totals.get(loan.id, (0.0, 0.0))
+            loan.total_principle_amount = principle_amount
+            loan.total_interest_amount = interest_amount
+
+    @api.multi
+    def _get_schedule_totals(self):
+        # Saved loans are summed by one grouped query, loans that only
+        # live in the cache (new records, onchange) are summed in Python
+        result = {}
+        loan_ids = []
+        for loan in self:
+            if not isinstance(loan.id, models.NewId) and not self.env.in_onchange:
+                loan_ids.append(loan.id)
+                continue
+            result[loan.id] = (
+                sum(loan.payment_schedule_ids.mapped("principle_amount")),
+                sum(loan.payment_schedule_ids.mapped("interest_amount")),
+            )
+        if loan_ids:
+            obj_payment = self.env[self._fields["payment_schedule_ids"].comodel_name]
+            groups = obj_payment.read_group(
+                [("loan_id", "in", loan_ids)],
+                ["loan_id", "principle_amount", "interest_amount"],
+                ["loan_id"],
+            )
+            for group in groups:
+                result[group["loan_id"][0]] = (
+                    group["principle_amount"],
+                    group["interest_amount"],
+                )
+        return result
+
+    @api.multi
+    @api.depends(
+        "payment_schedule_ids",
+        "payment_schedule_ids.principle_payment_state",
+        "payment_schedule_ids.interest_payment_state",
+    )
+    def _compute_outstanding_installment(self):
+        for loan in self:
+            schedules = loan.payment_schedule_ids.filtered(
+                lambda r: r.principle_payment_state != "paid"
+                or r.interest_payment_state != "paid"
+            )
+            loan.outstanding_installment_count = len(schedules)
 
     @api.multi
     def _compute_realization(self):
@@ -53,10 +105,38 @@ class LoanCommon(models.AbstractModel):
     @api.multi
     @api.depends(
         "type_id",
+        "state",
     )
     def _compute_policy(self):
-        _super = super(LoanCommon, self)
+        # Policies only read the loan type, the state and the groups of
+        # the user, so they are evaluated once per combination. A policy
+        # line whose python code reads other fields of the document would
+        # get the values of the first loan evaluated, such code is not
+        # supported on loans.
+        group_ids = tuple(sorted(self.env.user.groups_id.ids))
+        superuser = self.env.uid == SUPERUSER_ID
+        for loan in self:
+            values = self._get_policy_values(
+                loan.type_id.id, loan.state, group_ids, superuser
+            )
+            loan.update(dict(values))
+
+    @api.model
+    @tools.ormcache(skiparg=1)
+    def _get_policy_values(self, type_id, state, group_ids, superuser):
+        document = self.new(
+            {
+                "type_id": type_id,
+                "state": state,
+            }
+        )
+        _super = super(LoanCommon, document)
         _super._compute_policy()
+        return tuple(
+            (field_name, document[field_name])
+            for field_name, field in self._fields.items()
+            if field.compute == "_compute_policy"
+        )
 
     name = fields.Char(
         string="# Loan",
@@ -198,11 +278,43 @@ class LoanCommon(models.AbstractModel):
         compute="_compute_total",
         store=True,
     )
+    outstanding_installment_count = fields.Integer(
+        string="Outstanding Installments",
+        compute="_compute_outstanding_installment",
+        store=True,
+    )
     realized = fields.Boolean(
         string="Realized",
         compute="_compute_realization",
         store=True,
     )
+    approval_queued = fields.Boolean(
+        string="Queued for Approval",
+        readonly=True,
+        copy=False,
+        index=True,
+    )
+    approval_uid = fields.Many2one(
+        string="Queued for Approval By",
+        comodel_name="res.users",
+        readonly=True,
+        copy=False,
+    )
+    approval_error = fields.Text(
+        string="Approval Error",
+        readonly=True,
+        copy=False,
+    )
+    job_state = fields.Selection(
+        string="Background Job",
+        selection=[
+            ("pending", "Queued"),
+            ("running", "Running"),
+            ("failed", "Failed"),
+        ],
+        readonly=True,
+        copy=False,
+    )
     payment_schedule_ids = fields.One2many(
         string="Payment Schedules",
         comodel_name="loan.payment_schedule_common",
@@ -279,6 +391,7 @@ class LoanCommon(models.AbstractModel):
         comodel_name="account.move.line",
         readonly=True,
         copy=False,
+        index=True,
     )
     state = fields.Selection(
         string="State",
@@ -315,12 +428,23 @@ class LoanCommon(models.AbstractModel):
 
     @api.multi
     def _compute_allowed_move_line(self):
-        obj_account_move_line = self.env["account.move.line"]
+        offset = self.env.context.get("allowed_move_line_offset", 0)
+        limit = self.env.context.get("allowed_move_line_limit", None)
         for document in self:
-            move_line_ids = obj_account_move_line.search(
-                document._prepare_criteria_move_line()
+            document.allowed_move_line_ids = document._get_allowed_move_line_ids(
+                offset, limit
             )
-            document.allowed_move_line_ids = move_line_ids.ids
+
+    @api.multi
+    def _get_allowed_move_line_ids(self, offset=0, limit=None):
+        self.ensure_one()
+        obj_account_move_line = self.env["account.move.line"]
+        move_lines = obj_account_move_line.search(
+            self._prepare_criteria_move_line(),
+            offset=offset,
+            limit=limit,
+        )
+        return move_lines.ids
 
     allowed_move_line_ids = fields.Many2many(
         string="Realization Allowed Move Lines",
@@ -356,6 +480,8 @@ class LoanCommon(models.AbstractModel):
     def create(self, values):
         _super = super(LoanCommon, self)
         result = _super.create(values)
+        if self.env.context.get("loan_name_assigned", False):
+            return result
         sequence = result._create_sequence()
         result.write(
             {
@@ -364,6 +490,137 @@ class LoanCommon(models.AbstractModel):
         )
         return result
 
+    @api.model
+    def import_loans(
+        self,
+        values_list,
+        compute_payment=False,
+        approve=False,
+        chunk_size=500,
+        commit=True,
+    ):
+        """Create loans from a list of values in bulk
+
+        Loan numbers are reserved in one block per sequence and chunk,
+        inside the transaction of the chunk, and written on insert,
+        instead of one sequence call and one extra write per loan. A
+        failing chunk gives its numbers back on no gap sequences.
+        Payment schedules are generated when compute_payment is set,
+        approve also creates the realization entries. Every chunk is
+        committed when commit is set, so a failure only loses the
+        current chunk. Returns the created loans.
+        """
+        values_list = [self._prepare_import_values(values) for values in values_list]
+        obj_loan = self.with_context(
+            loan_name_assigned=True,
+            tracking_disable=True,
+            mail_create_nolog=True,
+            recompute=False,
+        )
+        cr = self.env.cr
+        loan_ids = []
+        for offset in range(0, len(values_list), chunk_size):
+            chunk_values = values_list[offset : offset + chunk_size]
+            names = self._reserve_import_names(chunk_values)
+            chunk_ids = []
+            for values, name in zip(chunk_values, names):
+                values["name"] = name
+                chunk_ids.append(obj_loan.create(values).id)
+            self.recompute()
+            loans = self.browse(chunk_ids)
+            if approve:
+                loans._approve()
+            elif compute_payment:
+                payment_datas = loans._get_payment_datas()
+                for loan in loans:
+                    loan._compute_payment(payment_datas[loan.id])
+            if commit:
+                cr.commit()  # pylint: disable=invalid-commit
+                self.env.invalidate_all()
+            loan_ids += chunk_ids
+            _logger.info(
+                "%s import: %d/%d loans", self._name, len(loan_ids), len(values_list)
+            )
+        return self.browse(loan_ids)
+
+    @api.model
+    def _prepare_import_values(self, values):
+        """Fill the values set by the loan type onchanges"""
+        result = dict(values)
+        if not result.get("company_id"):
+            result["company_id"] = self._default_company_id().id
+        loan_type = (
+            self.env["loan.type"]
+            .with_context(force_company=result["company_id"])
+            .browse(result["type_id"])
+        )
+        result.setdefault("maximum_loan_amount", loan_type.maximum_loan_amount)
+        result.setdefault(
+            "maximum_installment_period", loan_type.maximum_installment_period
+        )
+        result.setdefault("interest", loan_type.interest_amount)
+        return result
+
+    @api.model
+    def _reserve_import_names(self, values_list):
+        """Return one loan number per values, reserving one block of
+        numbers per sequence
+        """
+        indexes_by_sequence = {}
+        sequences = {}
+        for index, values in enumerate(values_list):
+            key = (values["type_id"], values["company_id"])
+            if key not in sequences:
+                document = self.with_context(force_company=key[1]).new(
+                    {
+                        "type_id": key[0],
+                        "company_id": key[1],
+                    }
+                )
+                sequences[key] = document._get_sequence()
+            indexes_by_sequence.setdefault(sequences[key], []).append(index)
+
+        result = ["/"] * len(values_list)
+        for sequence, indexes in indexes_by_sequence.items():
+            if not sequence:
+                continue
+            names = self._reserve_sequence_names(sequence, len(indexes))
+            for index, name in zip(indexes, names):
+                result[index] = name
+        return result
+
+    @api.model
+    def _reserve_sequence_names(self, sequence, count):
+        cr = self.env.cr
+        if sequence.implementation == "standard":
+            cr.execute(
+                "SELECT nextval(%s) FROM generate_series(1, %s)",
+                ("ir_sequence_%03d" % sequence.id, count),
+            )
+            numbers = [row[0] for row in cr.fetchall()]
+        else:
+            # Same row lock as ir.sequence._next, taken once for the block
+            cr.execute(
+                """
+                UPDATE ir_sequence
+                SET number_next = number_next + number_increment * %s
+                WHERE id = %s
+                RETURNING number_next, number_increment
+                """,
+                (count, sequence.id),
+            )
+            number_next, number_increment = cr.fetchone()
+            number_first = number_next - number_increment * count
+            numbers = [
+                number_first + number_increment * offset for offset in range(count)
+            ]
+            sequence.invalidate_cache(["number_next"], sequence.ids)
+        interpolation = sequence._interpolation_dict()
+        prefix = sequence._interpolate(sequence.prefix, interpolation)
+        suffix = sequence._interpolate(sequence.suffix, interpolation)
+        number_format = "%%0%sd" % sequence.padding
+        return [prefix + number_format % number + suffix for number in numbers]
+
     @api.multi
     def unlink(self):
         for loan in self:
@@ -384,45 +641,214 @@ class LoanCommon(models.AbstractModel):
 
     @api.multi
     def action_compute_payment(self):
+        if self._enqueue_job("action_compute_payment"):
+            return
+        payment_datas = self._get_payment_datas()
+        for loan in self:
+            loan._compute_payment(payment_datas[loan.id])
+
+    @api.multi
+    def _enqueue_job(self, method, records=None, **kwargs):
+        """Queue method as one background job per loan
+
+        Returns False, and queues nothing, when the action has to run
+        now: inside a job or when a company of the loans does not run
+        loan actions in background. records default to the loans,
+        otherwise they are split by their loan_id.
+        """
+        if self.env.context.get("loan_job_running", False) or not self:
+            return False
+        if not all(self.mapped("company_id.loan_background_job")):
+            return False
+        obj_job = self.env["loan.job"]
+        record_ids = {}
+        if records is not None:
+            for record in records:
+                record_ids.setdefault(record.loan_id.id, []).append(record.id)
         for loan in self:
-            loan._compute_payment()
+            if records is None:
+                loan_records = loan
+            else:
+                loan_records = records.browse(record_ids.get(loan.id, []))
+            obj_job._enqueue(loan, loan_records, method, kwargs)
+        return True
 
     @api.multi
-    def _compute_payment(self):
+    def _get_payment_datas(self):
+        # Schedule rows of every loan keyed by loan id. The whole
+        # recordset is priced in one call of the amortization engine.
+        obj_loan_type = self.env["loan.type"]
+        schedules = obj_loan_type._compute_interest_batch(
+            [loan.loan_amount for loan in self],
+            [loan.interest for loan in self],
+            [loan.manual_loan_period for loan in self],
+            [loan.first_payment_date for loan in self],
+            [loan.type_id.interest_method for loan in self],
+        )
+        result = {}
+        for loan, columns in zip(self, schedules):
+            result[loan.id] = amortization.columns_to_rows(columns)
+        return result
+
+    @api.multi
+    def _compute_payment(self, payment_datas=None):
         self.ensure_one()
         schedule_object_name = self.payment_schedule_ids._name
 
-        obj_payment = self.env[schedule_object_name]
-        obj_loan_type = self.env["loan.type"]
+        obj_payment = self.env[schedule_object_name].with_context(recompute=False)
 
-        self.payment_schedule_ids.unlink()
+        if payment_datas is None:
+            payment_datas = self._get_payment_datas()[self.id]
 
-        payment_datas = obj_loan_type._compute_interest(
-            self.loan_amount,
-            self.interest,
-            self.manual_loan_period,
-            self.first_payment_date,
-            self.type_id.interest_method,
-        )
+        # Reuse existing schedules in place and only insert or delete
+        # the difference. Stored fields are recomputed once at the end.
+        schedules = self.payment_schedule_ids.with_context(recompute=False)
+        for schedule, payment_data in zip(schedules, payment_datas):
+            data = schedule._prepare_schedule_update(payment_data)
+            if data:
+                schedule.write(data)
+
+        schedules[len(payment_datas) :].unlink()
 
-        for payment_data in payment_datas:
+        for payment_data in payment_datas[len(schedules) :]:
             payment_data.update({"loan_id": self.id})
             obj_payment.create(payment_data)
 
+        self.recompute()
+
     @api.multi
+    @instrumented("workflow_action_confirm")
     def workflow_action_confirm(self):
+        # The tier reviews of the whole set are requested in one call
         for loan in self:
             data = loan._prepare_confirm_data()
             loan.write(data)
-            loan.request_validation()
+        self.with_context(recompute=False).request_validation()
+        self.recompute()
 
     @api.multi
     def action_approve(self):
+        if self._enqueue_job("action_approve"):
+            return
+        self._approve()
+
+    @api.multi
+    @instrumented("action_approve")
+    def _approve(self):
+        # Batch callers approve in their own transactions and call this
+        # directly instead of queuing one job per loan
+        payment_datas = self._get_payment_datas()
         for loan in self:
-            loan._compute_payment()
+            loan._compute_payment(payment_datas[loan.id])
             data = loan._prepare_approve_data()
             loan.write(data)
 
+    @api.multi
+    def action_approve_batch(self, chunk_size=100, commit=True):
+        """Approve loans chunk by chunk
+
+        Every chunk runs in its own transaction when commit is set. A
+        failing chunk is rolled back and approved again loan by loan, see
+        _approve_chunk. Returns the statistics of every chunk.
+        """
+        cr = self.env.cr
+        result = []
+        for offset in range(0, len(self), chunk_size):
+            chunk = self[offset : offset + chunk_size]
+            loan_ids = chunk.ids
+            time_start = time.time()
+            failed_loans = chunk._approve_chunk()
+            if commit:
+                cr.commit()  # pylint: disable=invalid-commit
+            failed = bool(failed_loans)
+            elapsed = time.time() - time_start
+            stat = {
+                "loan_ids": loan_ids,
+                "failed": failed,
+                "failed_loan_ids": failed_loans.ids,
+                "elapsed": elapsed,
+                "throughput": len(loan_ids) / elapsed if elapsed else 0.0,
+            }
+            _logger.info(
+                "%s batch approval: %d loans in %.3fs (%.1f loans/s)%s",
+                self._name,
+                len(loan_ids),
+                elapsed,
+                stat["throughput"],
+                failed and " FAILED" or "",
+            )
+            result.append(stat)
+        return result
+
+    @api.multi
+    def _approve_chunk(self):
+        """Approve the loans in one savepoint, or loan by loan when the
+        chunk fails
+
+        Returns the loans that failed on their own. They leave the
+        approval queue with the error recorded in approval_error, so they
+        do not block the chunk again on the next run.
+        """
+        cr = self.env.cr
+        try:
+            with cr.savepoint():
+                self._approve()
+            return self.browse()
+        except Exception:
+            self.env.invalidate_all()
+            _logger.warning(
+                "Failed to approve %s %s, approving loan by loan",
+                self._name,
+                self.ids,
+            )
+        failed_loans = self.browse()
+        for loan in self:
+            try:
+                with cr.savepoint():
+                    loan._approve()
+            except Exception as error:
+                self.env.invalidate_all()
+                _logger.exception("Failed to approve %s %s", self._name, loan.id)
+                loan.write(
+                    {
+                        "approval_queued": False,
+                        "approval_error": "%s" % error,
+                    }
+                )
+                failed_loans |= loan
+        return failed_loans
+
+    @api.model
+    def process_approval_queue(self, chunk_size=100, commit=True):
+        """Approve the loans queued by a batch tier validation
+
+        Loans are approved as the user who validated them, so approve_uid
+        records that user instead of the cron user.
+        """
+        criteria = [
+            ("approval_queued", "=", True),
+            ("state", "=", "confirm"),
+        ]
+        result = []
+        loans_by_uid = {}
+        for loan in self.search(criteria):
+            uid = loan.approval_uid.id or self.env.uid
+            loans_by_uid.setdefault(uid, []).append(loan.id)
+        for uid, loan_ids in loans_by_uid.items():
+            loans = self.sudo(uid).browse(loan_ids)
+            result += loans.action_approve_batch(chunk_size=chunk_size, commit=commit)
+        return result
+
+    @api.multi
+    def _enqueue_approval(self):
+        self.write(
+            {
+                "approval_queued": True,
+                "approval_uid": self.env.uid,
+                "approval_error": False,
+            }
+        )
+
     @api.multi
     def workflow_action_active(self):
         for loan in self:
@@ -430,11 +856,26 @@ class LoanCommon(models.AbstractModel):
             loan.write(data)
 
     @api.multi
+    @instrumented("workflow_action_done")
     def workflow_action_done(self):
         for loan in self:
             data = loan._prepare_done_data()
             loan.write(data)
 
+    @api.multi
+    @instrumented("_update_loan_from_reconciliation")
+    def _update_loan_from_reconciliation(self, role):
+        if role == "header":
+            loans = self.filtered(lambda r: r.state == "approve")
+            loans.workflow_action_active()
+
+    @api.multi
+    def _complete_loan(self):
+        loans = self.filtered(
+            lambda r: r.state == "active" and r.outstanding_installment_count == 0
+        )
+        loans.workflow_action_done()
+
     @api.multi
     def action_cancel(self):
         for loan in self:
@@ -472,6 +913,9 @@ class LoanCommon(models.AbstractModel):
         move_id, move_line_header_id = self._create_realization_move()
         data = {
             "state": "approve",
+            "approval_queued": False,
+            "approval_uid": False,
+            "approval_error": False,
             "approve_date": fields.datetime.now(),
             "approve_uid": self.env.user.id,
             "move_realization_id": move_id,
@@ -487,28 +931,71 @@ class LoanCommon(models.AbstractModel):
         return data
 
     @api.multi
+    @instrumented("_create_realization_move")
     def _create_realization_move(self):
         self.ensure_one()
         obj_move = self.env["account.move"]
-        obj_line = self.env["account.move.line"]
 
-        move = obj_move.sudo().create(self._prepare_realization_move())
+        schedules = self.payment_schedule_ids
+        move_data = self._prepare_realization_move()
+        move_data["line_id"] = [
+            (0, 0, line_data) for line_data in self._prepare_realization_move_lines()
+        ]
+        move = obj_move.sudo().create(move_data)
+
+        # Lines are created in the order of the commands: header first,
+        # then one principle line per schedule, then the rounding line
+        lines = move.line_id.sorted(key=lambda line: line.id)
+        move_line_header = lines[0]
+        links = [(move_line_header, self, "header")]
+        for schedule, line in zip(schedules, lines[1:]):
+            schedule.principle_move_line_id = line
+            links.append((line, schedule, "principle"))
+        self.env["loan.move_line_link"]._register(links)
 
-        move_line_header = obj_line.sudo().create(self._prepare_header_move_line(move))
+        return move.id, move_line_header.id
 
-        for schedule in self.payment_schedule_ids:
-            schedule._create_principle_receivable_move_line(move)
+    @api.multi
+    def _prepare_realization_move_lines(self):
+        self.ensure_one()
+        obj_move = self.env["account.move"]
+        # Line values are prepared before the move exists
+        move = obj_move.browse()
+        result = [self._prepare_header_move_line(move)]
+        # Schedules are sorted by date, the ones after the boundary index
+        # go to the long-term principle account
+        schedules = self.payment_schedule_ids
+        boundary_index = bisect.bisect_right(
+            schedules.mapped("schedule_date"), self._get_principle_account_boundary()
+        )
+        for index, schedule in enumerate(schedules):
+            result.append(
+                schedule._prepare_principle_receivable_move_line(
+                    move, index >= boundary_index
+                )
+            )
 
+        # Amounts are rounded the way the move lines store them, so the
+        # balance is checked on the stored values
+        rounding = self.company_id.currency_id.rounding
         debit = credit = 0.0
-        for line in move.line_id:
-            debit += line.debit
-            credit += line.credit
-
-        if debit != credit:
-            amount = abs(debit - credit)
-            obj_line.sudo().create(self._prepare_rounding_move_line(move, amount))
-
-        return move.id, move_line_header.id
+        for line_data in result:
+            del line_data["move_id"]
+            line_data["debit"] = float_round(
+                line_data["debit"], precision_rounding=rounding
+            )
+            line_data["credit"] = float_round(
+                line_data["credit"], precision_rounding=rounding
+            )
+            debit += line_data["debit"]
+            credit += line_data["credit"]
+
+        amount = float_round(debit - credit, precision_rounding=rounding)
+        if not float_is_zero(amount, precision_rounding=rounding):
+            line_data = self._prepare_rounding_move_line(move, amount)
+            del line_data["move_id"]
+            result.append(line_data)
+        return result
 
     @api.multi
     def _delete_receivable_move(self):
@@ -540,25 +1027,31 @@ class LoanCommon(models.AbstractModel):
         self.ensure_one()
         return {
             "state": "cancel",
+            "approval_queued": False,
+            "approval_uid": False,
             "cancel_date": fields.datetime.now(),
             "cancel_uid": self.env.user.id,
         }
 
     @api.multi
-    def _get_realization_journal(self):
+    def _get_accounting_profile(self):
         self.ensure_one()
-        journal = self.type_id.realization_journal_id
+        return self.type_id._get_accounting_profile(self.company_id)
 
-        if not journal:
-            msg = _("No realization journal defined")
-            raise UserError(msg)
+    @api.multi
+    def _get_realization_journal(self):
+        self.ensure_one()
+        return self._get_accounting_profile().realization_journal_id
 
-        return journal
+    @api.multi
+    def _get_realization_period(self):
+        self.ensure_one()
+        obj_period = self.env["account.period"]
+        return obj_period._find_loan_period(self.date_realization, self.company_id)
 
     @api.multi
     def _prepare_realization_move(self):
         self.ensure_one()
-        obj_period = self.env["account.period"]
         if not self.date_realization:
             date_realization = fields.datetime.now()
         else:
@@ -569,7 +1062,7 @@ class LoanCommon(models.AbstractModel):
             "journal_id": self._get_realization_journal().id,
             "date": date_realization,
             "ref": self.name,
-            "period_id": obj_period.find(self.date_realization)[0].id,
+            "period_id": self._get_realization_period().id,
         }
         return res
 
@@ -584,15 +1077,20 @@ class LoanCommon(models.AbstractModel):
         return debit, credit
 
     @api.multi
-    def _get_realization_account(self):
+    def _get_principle_account_boundary(self):
+        """Return the last schedule date booked on the short-term
+        principle account, one year after the realization date
+        """
         self.ensure_one()
-        account = self.type_id.account_realization_id
-
-        if not account:
-            msg = _("No realization account defined")
-            raise UserError(msg)
+        date_as_of = fields.Date.from_string(
+            self.date_realization or fields.Date.context_today(self)
+        )
+        return fields.Date.to_string(date_as_of + timedelta(days=365))
 
-        return account
+    @api.multi
+    def _get_realization_account(self):
+        self.ensure_one()
+        return self._get_accounting_profile().account_realization_id
 
     @api.multi
     def _prepare_header_move_line(self, move):
@@ -612,42 +1110,79 @@ class LoanCommon(models.AbstractModel):
     @api.multi
     def _get_rounding_account(self):
         self.ensure_one()
-        account = self.type_id.account_rounding_id
-
-        if not account:
-            msg = _("No rounding account defined")
-            raise UserError(msg)
-
-        return account
+        return self._get_accounting_profile().account_rounding_id
 
     @api.multi
     def _prepare_rounding_move_line(self, move, amount):
+        # amount is debit minus credit of the other lines
         self.ensure_one()
         name = _("%s loan rounding") % (self.name)
         res = {
             "move_id": move.id,
             "name": name,
             "account_id": self._get_rounding_account().id,
-            "debit": 0.0,
-            "credit": amount,
+            "debit": amount < 0.0 and -amount or 0.0,
+            "credit": amount > 0.0 and amount or 0.0,
             "partner_id": self.partner_id.id,
         }
         return res
 
     @api.multi
     def validate_tier(self):
+        """Approve the loans validated by this call
+
+        A single validated loan is approved at once. Loans validated
+        together are queued for the approval cron, so clearing a review
+        queue does not wait for every realization entry.
+        """
         _super = super(LoanCommon, self)
         _super.validate_tier()
-        for record in self:
-            if record.validated:
-                record.action_approve()
+        loans = self.filtered(lambda r: r.validated)
+        if len(self) > 1:
+            loans._enqueue_approval()
+        else:
+            loans.action_approve()
+
+    @api.multi
+    def request_validation(self):
+        # Every domain tier definition is matched against the whole set in
+        # one search, instead of one search per loan and definition
+        evaluations = self._get_tier_evaluations()
+        _super = super(LoanCommon, self.with_context(loan_tier_evaluations=evaluations))
+        return _super.request_validation()
+
+    @api.multi
+    def evaluate_tier(self, tier):
+        evaluations = self.env.context.get("loan_tier_evaluations", {})
+        if tier.id in evaluations:
+            return self.filtered(lambda r: r.id in evaluations[tier.id])
+        return super(LoanCommon, self).evaluate_tier(tier)
+
+    @api.multi
+    def _get_tier_evaluations(self):
+        """Return the ids of the loans matching each domain tier
+        definition of the model, keyed by definition id
+        """
+        result = {}
+        obj_definition = self.env["tier.definition"]
+        if not self or "definition_domain" not in obj_definition._fields:
+            return result
+        criteria = [("model", "=", self._name)]
+        # Other definition types are evaluated per loan by evaluate_tier
+        if "definition_type" in obj_definition._fields:
+            criteria.append(("definition_type", "=", "domain"))
+        for definition in obj_definition.search(criteria):
+            domain = safe_eval(definition.definition_domain or "[]")
+            loans = self.search([("id", "in", self.ids)] + domain)
+            result[definition.id] = frozenset(loans.ids)
+        return result
 
     @api.multi
     def restart_validation(self):
         _super = super(LoanCommon, self)
         _super.restart_validation()
-        for record in self:
-            record.request_validation()
+        self.with_context(recompute=False).request_validation()
+        self.recompute()
 
     @api.multi
     def _prepare_criteria_move_line(self):
@@ -662,7 +1197,8 @@ class LoanCommon(models.AbstractModel):
     @api.multi
     def _prepare_criteria_direction_in(self):
         self.ensure_one()
-        account_realization_id = self.type_id.account_realization_id.id
+        profile = self._get_accounting_profile()
+        account_realization_id = profile.account_realization_id.id
         result = [
             ("partner_id", "=", self.partner_id.id),
             ("account_id", "=", account_realization_id),
@@ -673,7 +1209,8 @@ class LoanCommon(models.AbstractModel):
 
     @api.multi
     def _prepare_criteria_direction_out(self):
-        account_realization_id = self.type_id.account_realization_id.id
+        profile = self._get_accounting_profile()
+        account_realization_id = profile.account_realization_id.id
         result = [
             ("partner_id", "=", self.partner_id.id),
             ("account_id", "=", account_realization_id),
@@ -66,6 +66,11 @@ class LoanInPaymentSchedule(models.Model):
         comodel_name="account.move",
         related="interest_move_line_id.move_id",
     )
+    company_id = fields.Many2one(
+        comodel_name="res.company",
+        related="loan_id.company_id",
+        store=True,
+    )
     partner_id = fields.Many2one(
         comodel_name="res.partner",
         related="loan_id.partner_id",
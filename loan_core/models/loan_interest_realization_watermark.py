@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+# Copyright 2019 OpenSynergy Indonesia
+# License LGPL-3.0 or later (http://www.gnu.org/licenses/lgpl).
+
+import time
+
+import psycopg2
+
+from openerp import api, fields, models
+
+
+class LoanInterestRealizationWatermark(models.Model):
+    _name = "loan.interest_realization_watermark"
+    _description = "Loan Interest Realization Watermark"
+    _order = "model_name, company_id, partition_index"
+
+    company_id = fields.Many2one(
+        string="Company",
+        comodel_name="res.company",
+        required=True,
+        ondelete="cascade",
+    )
+    model_name = fields.Char(
+        string="Schedule Model",
+        required=True,
+    )
+    partition_count = fields.Integer(
+        string="Partition Count",
+        required=True,
+        default=1,
+    )
+    partition_index = fields.Integer(
+        string="Partition",
+        required=True,
+        default=0,
+    )
+    run_date = fields.Date(
+        string="Run Date",
+        readonly=True,
+    )
+    schedule_date = fields.Date(
+        string="Last Schedule Date",
+        readonly=True,
+    )
+    schedule_id = fields.Integer(
+        string="Last Schedule ID",
+        readonly=True,
+    )
+    state = fields.Selection(
+        string="State",
+        selection=[
+            ("running", "Running"),
+            ("done", "Done"),
+        ],
+        readonly=True,
+    )
+    date_start = fields.Datetime(
+        string="Start",
+        readonly=True,
+    )
+    date_end = fields.Datetime(
+        string="End",
+        readonly=True,
+    )
+    elapsed = fields.Float(
+        string="Elapsed (s)",
+        readonly=True,
+    )
+    processed_count = fields.Integer(
+        string="Processed Schedules",
+        readonly=True,
+    )
+    failed_count = fields.Integer(
+        string="Failed Schedules",
+        readonly=True,
+    )
+
+    _sql_constraints = [
+        (
+            "company_model_partition_unique",
+            "unique(company_id, model_name, partition_count, partition_index)",
+            "Watermark has to be unique per company, schedule model and partition",
+        ),
+    ]
+
+    @api.model
+    def _get_watermark(self, company, model_name, partition_count=1, partition_index=0):
+        """Return the watermark of the partition, created when missing
+
+        An empty recordset is returned when another worker creates the
+        same watermark at the same time, that worker runs the partition.
+        """
+        criteria = [
+            ("company_id", "=", company.id),
+            ("model_name", "=", model_name),
+            ("partition_count", "=", partition_count),
+            ("partition_index", "=", partition_index),
+        ]
+        watermark = self.search(criteria, limit=1)
+        if watermark:
+            return watermark
+        try:
+            with self.env.cr.savepoint():
+                watermark = self.create(
+                    {
+                        "company_id": company.id,
+                        "model_name": model_name,
+                        "partition_count": partition_count,
+                        "partition_index": partition_index,
+                    }
+                )
+        except psycopg2.IntegrityError:
+            return self.browse()
+        return watermark
+
+    @api.multi
+    def _get_lock_key(self):
+        self.ensure_one()
+        return "loan_interest_realization:%s:%s:%s/%s" % (
+            self.model_name,
+            self.company_id.id,
+            self.partition_index,
+            self.partition_count,
+        )
+
+    @api.multi
+    def _try_lock(self):
+        # Session level lock, it survives the commits between batches and
+        # is released by PostgreSQL if the worker dies. It only keeps a
+        # partition from running twice, overlapping partitions are kept
+        # apart by the row locks of _search_interest_realization_batch.
+        self.ensure_one()
+        self.env.cr.execute(
+            "SELECT pg_try_advisory_lock(hashtext(%s))", (self._get_lock_key(),)
+        )
+        return self.env.cr.fetchone()[0]
+
+    @api.multi
+    def _unlock(self):
+        self.ensure_one()
+        self.env.cr.execute(
+            "SELECT pg_advisory_unlock(hashtext(%s))", (self._get_lock_key(),)
+        )
+
+    @api.multi
+    def _start_run(self, run_date):
+        self.ensure_one()
+        data = {
+            "state": "running",
+            "date_start": fields.Datetime.now(),
+            "date_end": False,
+        }
+        # A run that did not finish on the same date is resumed from the
+        # last committed schedule, otherwise the run starts over.
+        if self.run_date != run_date:
+            data.update(
+                {
+                    "run_date": run_date,
+                    "schedule_date": False,
+                    "schedule_id": 0,
+                    "elapsed": 0.0,
+                    "processed_count": 0,
+                    "failed_count": 0,
+                }
+            )
+        self.write(data)
+        return time.time()
+
+    @api.multi
+    def _advance(self, schedule, processed_count, failed_count, time_start):
+        self.ensure_one()
+        self.write(
+            {
+                "schedule_date": schedule.schedule_date,
+                "schedule_id": schedule.id,
+                "processed_count": self.processed_count + processed_count,
+                "failed_count": self.failed_count + failed_count,
+                "elapsed": self.elapsed + time.time() - time_start,
+            }
+        )
+        return time.time()
+
+    @api.multi
+    def _finish_run(self, time_start):
+        self.ensure_one()
+        self.write(
+            {
+                "state": "done",
+                "date_end": fields.Datetime.now(),
+                "elapsed": self.elapsed + time.time() - time_start,
+            }
+        )
@@ -0,0 +1,491 @@
+# -*- coding: utf-8 -*-
+# Copyright 2019 OpenSynergy Indonesia
+# License LGPL-3.0 or later (http://www.gnu.org/licenses/lgpl).
+
+import json
+import logging
+from datetime import datetime, timedelta
+
+import psycopg2
+
+from openerp import api, fields, models
+from openerp.exceptions import Warning as UserError
+from openerp.tools.translate import _
+
+_logger = logging.getLogger(__name__)
+
+# Loan models and the models of their records a job may run on
+QUEUEABLE_MODELS = {
+    "loan.in": ["loan.in", "loan.in_payment_schedule"],
+    "loan.out": ["loan.out", "loan.out_payment_schedule"],
+}
+
+# Methods a job may call, see loan.common._enqueue_job
+QUEUEABLE_METHODS = [
+    "action_compute_payment",
+    "action_approve",
+    "action_long_to_short_term",
+    "_realize_interest_selection",
+]
+
+
+class LoanJob(models.Model):
+    _name = "loan.job"
+    _description = "Loan Background Job"
+    _order = "id desc"
+
+    name = fields.Char(
+        string="Job",
+        required=True,
+        readonly=True,
+    )
+    loan_model = fields.Char(
+        string="Loan Model",
+        required=True,
+        readonly=True,
+    )
+    loan_id = fields.Integer(
+        string="Loan ID",
+        required=True,
+        readonly=True,
+    )
+    res_model = fields.Char(
+        string="Model",
+        required=True,
+        readonly=True,
+    )
+    res_ids = fields.Text(
+        string="Record IDs",
+        required=True,
+        readonly=True,
+    )
+    method = fields.Char(
+        string="Method",
+        required=True,
+        readonly=True,
+    )
+    kwargs = fields.Text(
+        string="Arguments",
+        required=True,
+        readonly=True,
+        default="{}",
+    )
+    user_id = fields.Many2one(
+        string="Requested By",
+        comodel_name="res.users",
+        required=True,
+        readonly=True,
+    )
+    company_id = fields.Many2one(
+        string="Company",
+        comodel_name="res.company",
+        readonly=True,
+    )
+    loan_state = fields.Char(
+        string="Expected Loan State",
+        readonly=True,
+        help="State of the loan when the job was queued, the job is "
+        "skipped when the loan is no longer in that state",
+    )
+    state = fields.Selection(
+        string="State",
+        selection=[
+            ("pending", "Pending"),
+            ("running", "Running"),
+            ("done", "Done"),
+            ("skipped", "Skipped"),
+            ("failed", "Failed"),
+        ],
+        required=True,
+        readonly=True,
+        default="pending",
+        index=True,
+    )
+    record_count = fields.Integer(
+        string="Records",
+        readonly=True,
+    )
+    processed_count = fields.Integer(
+        string="Processed Records",
+        readonly=True,
+    )
+    progress = fields.Float(
+        string="Progress (%)",
+        compute="_compute_progress",
+    )
+    attempt_count = fields.Integer(
+        string="Attempts",
+        readonly=True,
+    )
+    max_attempts = fields.Integer(
+        string="Max. Attempts",
+        required=True,
+        default=3,
+    )
+    eta = fields.Datetime(
+        string="Not Before",
+        readonly=True,
+    )
+    date_started = fields.Datetime(
+        string="Started",
+        readonly=True,
+    )
+    date_done = fields.Datetime(
+        string="Done",
+        readonly=True,
+    )
+    error = fields.Text(
+        string="Error",
+        readonly=True,
+    )
+
+    @api.multi
+    @api.depends("record_count", "processed_count")
+    def _compute_progress(self):
+        for job in self:
+            if job.record_count:
+                job.progress = 100.0 * job.processed_count / job.record_count
+
+    def init(self, cr):
+        # One pending job per loan, method and arguments
+        cr.execute(
+            """
+            SELECT indexname
+            FROM pg_indexes
+            WHERE indexname = 'loan_job_pending_unique'
+            """
+        )
+        if not cr.fetchone():
+            cr.execute(
+                """
+                CREATE UNIQUE INDEX loan_job_pending_unique
+                ON loan_job (loan_model, loan_id, method, kwargs)
+                WHERE state = 'pending'
+                """
+            )
+
+    @api.model
+    def _enqueue(self, loan, records, method, kwargs=None):
+        """Queue method on records for loan, merging the records into
+        the pending job of the same loan, method and arguments
+
+        Users only read jobs, the job is written as superuser and runs
+        as the user queuing it.
+        """
+        kwargs = json.dumps(kwargs or {}, sort_keys=True)
+        data = self._prepare_job(loan, records, method, kwargs)
+        obj_job = self.sudo()
+        criteria = [
+            ("loan_model", "=", loan._name),
+            ("loan_id", "=", loan.id),
+            ("method", "=", method),
+            ("kwargs", "=", kwargs),
+            ("state", "=", "pending"),
+        ]
+        job = obj_job.search(criteria, limit=1)
+        if job:
+            res_ids = json.loads(job.res_ids)
+            res_ids += [res_id for res_id in records.ids if res_id not in res_ids]
+            data = job._prepare_res_ids(res_ids)
+            data["loan_state"] = loan.state
+            job.write(data)
+            return job
+        try:
+            with self.env.cr.savepoint():
+                job = obj_job.create(data)
+        except psycopg2.IntegrityError:
+            # Another transaction queued the same job meanwhile
+            return obj_job.search(criteria, limit=1)
+        loan.write(
+            {
+                "job_state": "pending",
+            }
+        )
+        return job
+
+    @api.model
+    def _prepare_job(self, loan, records, method, kwargs):
+        self._check_queueable(loan._name, records._name, method)
+        data = {
+            "name": "%s: %s" % (loan.display_name, method),
+            "loan_model": loan._name,
+            "loan_id": loan.id,
+            "loan_state": loan.state,
+            "res_model": records._name,
+            "method": method,
+            "kwargs": kwargs,
+            "user_id": self.env.uid,
+            "company_id": loan.company_id.id,
+        }
+        data.update(self._prepare_res_ids(records.ids))
+        return data
+
+    @api.model
+    def _check_queueable(self, loan_model, res_model, method):
+        if res_model not in QUEUEABLE_MODELS.get(loan_model, []):
+            msg = _("%s records can not be queued for %s") % (res_model, loan_model)
+            raise UserError(msg)
+        if method not in QUEUEABLE_METHODS:
+            msg = _("Method %s can not be queued") % method
+            raise UserError(msg)
+
+    @api.model
+    def _prepare_res_ids(self, res_ids):
+        return {
+            "res_ids": json.dumps(res_ids),
+            "record_count": len(res_ids),
+        }
+
+    @api.model
+    def process_jobs(self, limit=20, chunk_size=50):
+        """Run pending jobs, one transaction per chunk of records"""
+        self._requeue_stale_jobs()
+        cr = self.env.cr
+        cr.execute(
+            """
+            SELECT id
+            FROM loan_job
+            WHERE state = 'pending'
+            AND (eta IS NULL OR eta <= now() AT TIME ZONE 'UTC')
+            ORDER BY id
+            LIMIT %s
+            """,
+            (limit,),
+        )
+        job_ids = [row[0] for row in cr.fetchall()]
+        for job in self.browse(job_ids):
+            if not job._try_lock():
+                continue
+            try:
+                # Another worker may have run it since the select
+                job.invalidate_cache()
+                if job.state == "pending":
+                    job._run(chunk_size)
+            finally:
+                job._unlock()
+
+    @api.multi
+    def _get_lock_key(self):
+        self.ensure_one()
+        return "loan_job:%s" % self.id
+
+    @api.multi
+    def _try_lock(self):
+        # Held by the worker for the whole run, see _requeue_stale_jobs
+        self.ensure_one()
+        self.env.cr.execute(
+            "SELECT pg_try_advisory_lock(hashtext(%s))", (self._get_lock_key(),)
+        )
+        return self.env.cr.fetchone()[0]
+
+    @api.multi
+    def _unlock(self):
+        self.ensure_one()
+        self.env.cr.execute(
+            "SELECT pg_advisory_unlock(hashtext(%s))", (self._get_lock_key(),)
+        )
+
+    @api.model
+    def _requeue_stale_jobs(self):
+        # A running job whose lock is free lost its worker
+        for job in self.search([("state", "=", "running")]):
+            if not job._try_lock():
+                continue
+            job._unlock()
+            job._requeue({})
+        self.env.cr.commit()  # pylint: disable=invalid-commit
+
+    @api.multi
+    def _merge_into_pending_job(self):
+        # The pending job of the same loan, method and arguments takes
+        # over the records this job did not process
+        self.ensure_one()
+        criteria = [
+            ("loan_model", "=", self.loan_model),
+            ("loan_id", "=", self.loan_id),
+            ("method", "=", self.method),
+            ("kwargs", "=", self.kwargs),
+            ("state", "=", "pending"),
+        ]
+        job = self.search(criteria, limit=1)
+        res_ids = json.loads(job.res_ids)
+        for res_id in json.loads(self.res_ids)[self.processed_count :]:
+            if res_id not in res_ids:
+                res_ids.append(res_id)
+        job.write(job._prepare_res_ids(res_ids))
+        self.write(
+            {
+                "state": "done",
+                "date_done": fields.Datetime.now(),
+                "error": _("Remaining records moved to job %s") % job.id,
+            }
+        )
+
+    @api.multi
+    def _run(self, chunk_size):
+        self.ensure_one()
+        cr = self.env.cr
+        try:
+            self._check_queueable(self.loan_model, self.res_model, self.method)
+        except UserError as error:
+            self.write(
+                {
+                    "state": "failed",
+                    "date_done": fields.Datetime.now(),
+                    "error": "%s" % error,
+                }
+            )
+            self._set_loan_job_state("failed")
+            cr.commit()  # pylint: disable=invalid-commit
+            return
+        self.write(
+            {
+                "state": "running",
+                "date_started": fields.Datetime.now(),
+                "attempt_count": self.attempt_count + 1,
+            }
+        )
+        self._set_loan_job_state("running")
+        cr.commit()  # pylint: disable=invalid-commit
+
+        res_ids = json.loads(self.res_ids)
+        kwargs = json.loads(self.kwargs)
+        obj_record = (
+            self.env[self.res_model]
+            .sudo(self.user_id.id)
+            .with_context(loan_job_running=True)
+        )
+        loan_state = self.loan_state
+        try:
+            for offset in range(self.processed_count, len(res_ids), chunk_size):
+                # The loan may have been approved, cancelled or closed
+                # since the job was queued
+                loan_state = self._get_loan_state()
+                if loan_state != self.loan_state:
+                    break
+                chunk_ids = res_ids[offset : offset + chunk_size]
+                records = obj_record.browse(chunk_ids).exists()
+                getattr(records, self.method)(**kwargs)
+                self.write(
+                    {
+                        "processed_count": offset + len(chunk_ids),
+                    }
+                )
+                cr.commit()  # pylint: disable=invalid-commit
+        except Exception as error:
+            cr.rollback()
+            self.env.invalidate_all()
+            _logger.exception("Loan job %s failed", self.id)
+            self._retry_or_fail(error)
+        else:
+            if loan_state != self.loan_state:
+                self._skip(loan_state)
+            else:
+                self._done()
+        cr.commit()  # pylint: disable=invalid-commit
+
+    @api.multi
+    def _get_loan_state(self):
+        self.ensure_one()
+        if not self.loan_state:
+            return False
+        obj_loan = self.env[self.loan_model]
+        obj_loan.invalidate_cache(["state"], [self.loan_id])
+        return obj_loan.browse(self.loan_id).exists().state
+
+    @api.multi
+    def _done(self):
+        self.ensure_one()
+        self.write(
+            {
+                "state": "done",
+                "date_done": fields.Datetime.now(),
+                "error": False,
+            }
+        )
+        self._set_loan_job_state(False)
+
+    @api.multi
+    def _skip(self, loan_state):
+        self.ensure_one()
+        self.write(
+            {
+                "state": "skipped",
+                "date_done": fields.Datetime.now(),
+                "error": _("Loan is in state %s instead of %s, job skipped")
+                % (loan_state, self.loan_state),
+            }
+        )
+        self._set_loan_job_state(False)
+
+    @api.multi
+    def _retry_or_fail(self, error):
+        self.ensure_one()
+        error = "%s" % error
+        if self.attempt_count < self.max_attempts:
+            # Exponential backoff: 1, 2, 4... minutes
+            eta = datetime.utcnow() + timedelta(minutes=2 ** (self.attempt_count - 1))
+            self._requeue(
+                {
+                    "eta": fields.Datetime.to_string(eta),
+                    "error": error,
+                }
+            )
+        else:
+            self.write(
+                {
+                    "state": "failed",
+                    "date_done": fields.Datetime.now(),
+                    "error": error,
+                }
+            )
+            self._set_loan_job_state("failed")
+
+    @api.multi
+    def _set_loan_job_state(self, job_state):
+        self.ensure_one()
+        if not job_state:
+            criteria = [
+                ("loan_model", "=", self.loan_model),
+                ("loan_id", "=", self.loan_id),
+                ("state", "in", ["pending", "running"]),
+                ("id", "!=", self.id),
+            ]
+            if self.search(criteria, limit=1):
+                job_state = "pending"
+        loan = self.env[self.loan_model].browse(self.loan_id).exists()
+        loan.write(
+            {
+                "job_state": job_state,
+            }
+        )
+
+    @api.multi
+    def action_requeue(self):
+        for job in self:
+            if job.state != "failed":
+                msg = _("Only failed jobs can be queued again")
+                raise UserError(msg)
+            job._requeue(
+                {
+                    "attempt_count": 0,
+                    "eta": False,
+                }
+            )
+
+    @api.multi
+    def _requeue(self, values):
+        """Set the job pending again with values, or merge its remaining
+        records into the pending job of the same loan, method and
+        arguments
+        """
+        self.ensure_one()
+        data = dict(values)
+        data["state"] = "pending"
+        try:
+            with self.env.cr.savepoint():
+                self.write(data)
+        except psycopg2.IntegrityError:
+            self.invalidate_cache()
+            self._merge_into_pending_job()
+        self._set_loan_job_state("pending")
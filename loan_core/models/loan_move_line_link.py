@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+# Copyright 2019 OpenSynergy Indonesia
+# License LGPL-3.0 or later (http://www.gnu.org/licenses/lgpl).
+
+from openerp import api, fields, models
+
+
+class LoanMoveLineLink(models.Model):
+    _name = "loan.move_line_link"
+    _description = "Loan Move Line Link"
+    _rec_name = "move_line_id"
+
+    move_line_id = fields.Many2one(
+        string="Move Line",
+        comodel_name="account.move.line",
+        required=True,
+        ondelete="cascade",
+        index=True,
+    )
+    res_model = fields.Char(
+        string="Document Model",
+        required=True,
+    )
+    res_id = fields.Integer(
+        string="Document ID",
+        required=True,
+    )
+    role = fields.Selection(
+        string="Role",
+        selection=[
+            ("header", "Realization Header"),
+            ("principle", "Principle Receivable"),
+            ("old_principle", "Reclassified Principle Receivable"),
+            ("interest", "Interest Receivable"),
+            ("long_term", "Long-Term Reclassification"),
+        ],
+        required=True,
+    )
+
+    def init(self, cr):
+        cr.execute(
+            """
+            SELECT 1
+            FROM pg_indexes
+            WHERE indexname = 'loan_move_line_link_document_index'
+            """
+        )
+        if not cr.fetchone():
+            cr.execute(
+                """
+                CREATE INDEX loan_move_line_link_document_index
+                ON loan_move_line_link (res_model, res_id, role)
+                """
+            )
+
+    @api.model
+    def _register(self, links):
+        """Insert links in one statement
+
+        links is a list of (move line, document, role) tuples.
+        """
+        if not links:
+            return
+        # Users only read the links, they are written as superuser
+        obj_link = self.sudo()
+        values = []
+        params = []
+        for move_line, document, role in links:
+            values.append("(%s, %s, %s, %s, %s, %s, %s, %s)")
+            params += [
+                move_line.id,
+                document._name,
+                document.id,
+                role,
+                self.env.uid,
+                self.env.uid,
+                fields.Datetime.now(),
+                fields.Datetime.now(),
+            ]
+        rows = ", ".join(values)
+        query = (
+            """
+            INSERT INTO loan_move_line_link
+            (move_line_id, res_model, res_id, role,
+            create_uid, write_uid, create_date, write_date)
+            VALUES %s
+            """
+            % rows
+        )
+        obj_link.env.cr.execute(query, params)
+
+    @api.model
+    def _replace_role(self, move_lines, role, new_role):
+        """Move the links of move_lines from role to new_role"""
+        if not move_lines:
+            return
+        obj_link = self.sudo()
+        obj_link.env.cr.execute(
+            """
+            UPDATE loan_move_line_link
+            SET role = %s, write_uid = %s, write_date = %s
+            WHERE move_line_id IN %s
+            AND role = %s
+            """,
+            (
+                new_role,
+                self.env.uid,
+                fields.Datetime.now(),
+                tuple(move_lines.ids),
+                role,
+            ),
+        )
+        obj_link.invalidate_cache(["role"])
+
+    @api.model
+    def _get_move_lines(self, document, role):
+        criteria = [
+            ("res_model", "=", document._name),
+            ("res_id", "=", document.id),
+            ("role", "=", role),
+        ]
+        return self.search(criteria).mapped("move_line_id")
+
+    @api.multi
+    def _update_loan_from_reconciliation(self):
+        groups = {}
+        for link in self:
+            key = (link.res_model, link.role)
+            groups.setdefault(key, []).append(link.res_id)
+        for (res_model, role), res_ids in groups.items():
+            documents = self.env[res_model].browse(res_ids).exists()
+            documents._update_loan_from_reconciliation(role)
@@ -0,0 +1,289 @@
+# -*- coding: utf-8 -*-
+# Copyright 2019 OpenSynergy Indonesia
+# License LGPL-3.0 or later (http://www.gnu.org/licenses/lgpl).
+
+import functools
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+from openerp import SUPERUSER_ID, api, fields, models
+
+_logger = logging.getLogger(__name__)
+
+# Seconds between two writes of the buffered statistics of a worker
+FLUSH_INTERVAL = 60
+
+# dbname -> {(model, operation, type id): accumulated statistics}
+_STAT_BUFFER = {}
+# dbname -> time of the last flush
+_STAT_FLUSH = {}
+_STAT_LOCK = threading.Lock()
+
+
+def _is_enabled(env):
+    # The loan_operation_stat context key overrides the company setting
+    if "loan_operation_stat" in env.context:
+        return env.context["loan_operation_stat"]
+    return env.user.company_id.loan_operation_stat
+
+
+def _get_cache_size(env):
+    return sum(len(values) for values in env.cache.values())
+
+
+def _get_rows_affected(cr):
+    cr.execute(
+        "SELECT COALESCE(SUM(n_tup_ins + n_tup_upd + n_tup_del), 0) "
+        "FROM pg_stat_xact_user_tables"
+    )
+    return cr.fetchone()[0]
+
+
+@contextmanager
+def instrument(records, operation):
+    """Measure the operation run on records inside the block
+
+    Only active when the loan_operation_stat context key, or the option
+    of the user's company, is set. Query count, rows affected, wall time
+    and field values loaded into the ORM cache are written to the log as
+    one JSON object and buffered in memory. The buffer is added to
+    loan.operation_stat per model, operation and loan type at most every
+    FLUSH_INTERVAL seconds, in a transaction of its own. Nothing is
+    stored when the block raises.
+    """
+    env = records.env
+    if not _is_enabled(env):
+        yield
+        return
+    cr = env.cr
+    rows_start = _get_rows_affected(cr)
+    query_start = cr.sql_log_count
+    cache_start = _get_cache_size(env)
+    time_start = time.time()
+    failed = True
+    try:
+        yield
+        failed = False
+    finally:
+        wall_time = time.time() - time_start
+        query_count = cr.sql_log_count - query_start
+        cache_miss_count = max(_get_cache_size(env) - cache_start, 0)
+        data = {
+            "model": records._name,
+            "operation": operation,
+            "record_count": len(records),
+            "query_count": query_count,
+            "wall_time": wall_time,
+            "cache_miss_count": cache_miss_count,
+            "failed": failed,
+        }
+        if not failed:
+            data["rows_affected"] = _get_rows_affected(cr) - rows_start
+            data["type_id"] = env["loan.operation_stat"]._get_type_id(records)
+            _buffer(cr.dbname, data)
+        _logger.info("loan_operation %s", json.dumps(data, sort_keys=True))
+        if not failed:
+            _flush(env)
+
+
+def _buffer(dbname, data):
+    key = (data["model"], data["operation"], data["type_id"])
+    with _STAT_LOCK:
+        stats = _STAT_BUFFER.setdefault(dbname, {})
+        stat = stats.setdefault(
+            key,
+            {
+                "call_count": 0,
+                "record_count": 0,
+                "query_count": 0,
+                "rows_affected": 0,
+                "wall_time": 0.0,
+                "cache_miss_count": 0,
+            },
+        )
+        stat["call_count"] += 1
+        for field_name in stat:
+            if field_name != "call_count":
+                stat[field_name] += data[field_name]
+
+
+def _flush(env, force=False):
+    """Write the buffered statistics of the database with a new cursor,
+    so the business transaction never locks the statistic rows
+    """
+    dbname = env.cr.dbname
+    now = time.time()
+    with _STAT_LOCK:
+        last_flush = _STAT_FLUSH.setdefault(dbname, now)
+        if not force and now - last_flush < FLUSH_INTERVAL:
+            return
+        _STAT_FLUSH[dbname] = now
+        stats = _STAT_BUFFER.pop(dbname, {})
+    if not stats:
+        return
+    try:
+        with env.registry.cursor() as cr:
+            stat_env = api.Environment(cr, SUPERUSER_ID, {})
+            stat_env["loan.operation_stat"]._accumulate(stats)
+    except Exception:
+        _logger.exception("Failed to store loan operation statistics")
+
+
+def instrumented(operation):
+    """Decorate a recordset method so every call runs in instrument()"""
+
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with instrument(self, operation):
+                return method(self, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+class LoanOperationStat(models.Model):
+    _name = "loan.operation_stat"
+    _description = "Loan Operation Statistic"
+    _order = "res_model, operation, type_id"
+
+    res_model = fields.Char(
+        string="Model",
+        required=True,
+        readonly=True,
+    )
+    operation = fields.Char(
+        string="Operation",
+        required=True,
+        readonly=True,
+    )
+    type_id = fields.Many2one(
+        string="Loan Type",
+        comodel_name="loan.type",
+        readonly=True,
+        ondelete="cascade",
+        help="Empty when the records of a call belong to several loan types",
+    )
+    call_count = fields.Integer(
+        string="Calls",
+        readonly=True,
+    )
+    record_count = fields.Integer(
+        string="Records",
+        readonly=True,
+    )
+    query_count = fields.Integer(
+        string="Queries",
+        readonly=True,
+    )
+    rows_affected = fields.Integer(
+        string="Rows Affected",
+        readonly=True,
+    )
+    wall_time = fields.Float(
+        string="Wall Time (s)",
+        readonly=True,
+    )
+    cache_miss_count = fields.Integer(
+        string="Cache Misses",
+        readonly=True,
+        help="Field values loaded into the ORM cache during the calls",
+    )
+    last_call = fields.Datetime(
+        string="Last Call",
+        readonly=True,
+    )
+    average_wall_time = fields.Float(
+        string="Average Wall Time (s)",
+        compute="_compute_average",
+    )
+    average_query_count = fields.Float(
+        string="Average Queries",
+        compute="_compute_average",
+    )
+
+    @api.multi
+    def _compute_average(self):
+        for stat in self:
+            if stat.call_count:
+                stat.average_wall_time = stat.wall_time / stat.call_count
+                stat.average_query_count = stat.query_count / float(stat.call_count)
+
+    def init(self, cr):
+        cr.execute(
+            """
+            SELECT indexname
+            FROM pg_indexes
+            WHERE indexname = 'loan_operation_stat_key_index'
+            """
+        )
+        if not cr.fetchone():
+            cr.execute(
+                """
+                CREATE UNIQUE INDEX loan_operation_stat_key_index
+                ON loan_operation_stat
+                (res_model, operation, (COALESCE(type_id, 0)))
+                """
+            )
+
+    @api.model
+    def _get_type_id(self, records):
+        if "type_id" in records._fields:
+            loan_types = records.mapped("type_id")
+        elif "loan_id" in records._fields:
+            loan_types = records.mapped("loan_id.type_id")
+        else:
+            return None
+        return len(loan_types) == 1 and loan_types.id or None
+
+    @api.model
+    def _accumulate(self, stats):
+        """Add stats, a dict of accumulated statistics keyed by
+        (model, operation, type id), to the stored statistics
+        """
+        for (res_model, operation, type_id), stat in sorted(stats.items()):
+            self.env.cr.execute(
+                """
+                INSERT INTO loan_operation_stat
+                (res_model, operation, type_id, call_count, record_count,
+                 query_count, rows_affected, wall_time, cache_miss_count,
+                 last_call)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s,
+                        now() AT TIME ZONE 'UTC')
+                ON CONFLICT (res_model, operation, (COALESCE(type_id, 0)))
+                DO UPDATE SET
+                    call_count = loan_operation_stat.call_count
+                        + EXCLUDED.call_count,
+                    record_count = loan_operation_stat.record_count
+                        + EXCLUDED.record_count,
+                    query_count = loan_operation_stat.query_count
+                        + EXCLUDED.query_count,
+                    rows_affected = loan_operation_stat.rows_affected
+                        + EXCLUDED.rows_affected,
+                    wall_time = loan_operation_stat.wall_time
+                        + EXCLUDED.wall_time,
+                    cache_miss_count = loan_operation_stat.cache_miss_count
+                        + EXCLUDED.cache_miss_count,
+                    last_call = EXCLUDED.last_call
+                """,
+                (
+                    res_model,
+                    operation,
+                    type_id,
+                    stat["call_count"],
+                    stat["record_count"],
+                    stat["query_count"],
+                    stat["rows_affected"],
+                    stat["wall_time"],
+                    stat["cache_miss_count"],
+                ),
+            )
+
+    @api.model
+    def flush_stats(self):
+        """Store the statistics buffered by this worker right away"""
+        _flush(self.env, force=True)
@@ -2,12 +2,20 @@
 # Copyright 2019 OpenSynergy Indonesia
 # License LGPL-3.0 or later (http://www.gnu.org/licenses/lgpl).
 
-from datetime import datetime
+import logging
+import time
+from datetime import datetime, timedelta
+
+from psycopg2.extensions import TransactionRollbackError
 
 from openerp import api, fields, models
 from openerp.exceptions import Warning as UserError
 from openerp.tools.translate import _
 
+from .loan_operation_stat import instrumented
+
+_logger = logging.getLogger(__name__)
+
 DATE_SELECTION = map(lambda x: [x, str(x)], range(1, 32))
 
 
@@ -26,34 +34,38 @@ class LoanPaymentScheduleCommon(models.AbstractModel):
 
     @api.multi
     def _compute_state(self):
+        move_lines = self.mapped("principle_move_line_id") + self.mapped(
+            "interest_move_line_id"
+        )
+        payment_states = self._get_move_line_payment_states(move_lines)
         for payment in self:
-            principle_move_line = payment.principle_move_line_id
-            interest_move_line = payment.interest_move_line_id
-            if not principle_move_line:
-                payment.principle_payment_state = "unpaid"
-            elif (
-                principle_move_line
-                and not principle_move_line.reconcile_partial_id
-                and not principle_move_line.reconcile_id
-            ):
-                payment.principle_payment_state = "unpaid"
-            elif principle_move_line.reconcile_partial_id:
-                payment.principle_payment_state = "partial"
-            elif principle_move_line.reconcile_id:
-                payment.principle_payment_state = "paid"
-
-            if not interest_move_line:
-                payment.interest_payment_state = "unpaid"
-            elif (
-                interest_move_line
-                and not interest_move_line.reconcile_partial_id
-                and not interest_move_line.reconcile_id
-            ):
-                payment.interest_payment_state = "unpaid"
-            elif interest_move_line.reconcile_partial_id:
-                payment.interest_payment_state = "partial"
-            elif interest_move_line.reconcile_id:
-                payment.interest_payment_state = "paid"
+            payment.principle_payment_state = payment_states.get(
+                payment.principle_move_line_id.id, "unpaid"
+            )
+            payment.interest_payment_state = payment_states.get(
+                payment.interest_move_line_id.id, "unpaid"
+            )
+
+    @api.model
+    def _get_move_line_payment_states(self, move_lines):
+        # Reconcile status of every move line of the batch in one query
+        if not move_lines:
+            return {}
+        self.env.cr.execute(
+            """
+            SELECT
+                id,
+                CASE
+                    WHEN reconcile_partial_id IS NOT NULL THEN 'partial'
+                    WHEN reconcile_id IS NOT NULL THEN 'paid'
+                    ELSE 'unpaid'
+                END
+            FROM account_move_line
+            WHERE id IN %s
+            """,
+            (tuple(move_lines.ids),),
+        )
+        return dict(self.env.cr.fetchall())
 
     loan_id = fields.Many2one(
         string="# Loan",
@@ -61,6 +73,12 @@ class LoanPaymentScheduleCommon(models.AbstractModel):
         ondelete="cascade",
         copy=False,
     )
+    company_id = fields.Many2one(
+        string="Company",
+        comodel_name="res.company",
+        readonly=True,
+        copy=False,
+    )
     partner_id = fields.Many2one(
         string="Partner",
         comodel_name="res.partner",
@@ -123,12 +141,14 @@ class LoanPaymentScheduleCommon(models.AbstractModel):
         comodel_name="account.move.line",
         readonly=True,
         copy=False,
+        index=True,
     )
     old_principle_move_line_id = fields.Many2one(
         string="Old Principle Move Line",
         comodel_name="account.move.line",
         readonly=True,
         copy=False,
+        index=True,
     )
     principle_move_id = fields.Many2one(
         string="Principle Move",
@@ -140,6 +160,7 @@ class LoanPaymentScheduleCommon(models.AbstractModel):
         comodel_name="account.move.line",
         readonly=True,
         copy=False,
+        index=True,
     )
     interest_move_id = fields.Many2one(
         string="Interest Move",
@@ -160,6 +181,22 @@ class LoanPaymentScheduleCommon(models.AbstractModel):
         copy=False,
     )
 
+    def init(self, cr):
+        if not self._auto:
+            return
+        # Due schedules without interest entry are what the interest
+        # realization cron looks for
+        index_name = "%s_interest_realization_index" % self._table
+        cr.execute("SELECT 1 FROM pg_indexes WHERE indexname = %s", (index_name,))
+        if not cr.fetchone():
+            cr.execute(
+                """
+                CREATE INDEX %s ON %s (state, schedule_date)
+                WHERE interest_move_line_id IS NULL
+                """
+                % (index_name, self._table)
+            )
+
     @api.multi
     def name_get(self):
         res = []
@@ -169,21 +206,42 @@ class LoanPaymentScheduleCommon(models.AbstractModel):
         return res
 
     @api.multi
+    def _prepare_schedule_update(self, payment_data):
+        self.ensure_one()
+        res = {}
+        for field_name, value in payment_data.items():
+            if self[field_name] != value:
+                res[field_name] = value
+        return res
+
+    @api.multi
+    @instrumented("_update_loan_from_reconciliation")
+    def _update_loan_from_reconciliation(self, role):
+        if role in ("principle", "interest"):
+            self.mapped("loan_id")._complete_loan()
+
+    @api.multi
+    @instrumented("action_realize_interest")
     def action_realize_interest(self, date_realization=False):
-        for schedule in self:
+        consolidated = self._filter_interest_consolidation()
+        for schedule in self - consolidated:
             schedule._create_interest_realization_move(date_realization)
+        if consolidated:
+            consolidated._create_consolidated_interest_realization_move(
+                date_realization
+            )
+
+    @api.multi
+    def _filter_interest_consolidation(self):
+        return self.filtered(
+            lambda r: r.loan_id._get_accounting_profile().interest_consolidation
+        )
 
     @api.multi
     def _get_interest_journal(self):
         self.ensure_one()
         loan = self.loan_id
-        journal = loan.type_id.interest_journal_id
-
-        if not journal:
-            msg = _("No interest journal defined")
-            raise UserError(msg)
-
-        return journal
+        return loan._get_accounting_profile().interest_journal_id
 
     @api.multi
     def _prepare_interest_realization_move(self, date_realization=False):
@@ -192,12 +250,13 @@ class LoanPaymentScheduleCommon(models.AbstractModel):
             date_realization = self.schedule_date
         obj_period = self.env["account.period"]
         loan = self.loan_id
+        period = obj_period._find_loan_period(date_realization, loan.company_id)
         res = {
             "name": "/",
             "journal_id": self._get_interest_journal().id,
             "date": date_realization,
             "ref": loan.name,
-            "period_id": obj_period.find(date_realization)[0].id,
+            "period_id": period.id,
         }
         return res
 
@@ -216,9 +275,67 @@ class LoanPaymentScheduleCommon(models.AbstractModel):
         )
 
         self.interest_move_line_id = line_receivable
+        self.env["loan.move_line_link"]._register([(line_receivable, self, "interest")])
 
         obj_line.sudo().create(self._prepare_interest_income_move_line(move))
 
+    @api.multi
+    def _create_consolidated_interest_realization_move(self, date_realization):
+        obj_move = self.env["account.move"]
+        groups = {}
+        for schedule in self:
+            key = schedule._get_interest_consolidation_key(date_realization)
+            groups.setdefault(key, []).append(schedule.id)
+
+        for (journal_id, date_move, company_id), schedule_ids in groups.items():
+            schedules = self.browse(schedule_ids)
+            move_data = schedules._prepare_consolidated_interest_realization_move(
+                journal_id, date_move, company_id
+            )
+            move = obj_move.sudo().create(move_data)
+            # Every schedule adds its receivable line then its income line,
+            # in the order of the commands
+            lines = move.line_id.sorted(key=lambda line: line.id)
+            links = []
+            for schedule, line in zip(schedules, lines[0::2]):
+                schedule.interest_move_line_id = line
+                links.append((line, schedule, "interest"))
+            self.env["loan.move_line_link"]._register(links)
+
+    @api.multi
+    def _get_interest_consolidation_key(self, date_realization=False):
+        self.ensure_one()
+        return (
+            self._get_interest_journal().id,
+            date_realization or self.schedule_date,
+            self.loan_id.company_id.id,
+        )
+
+    @api.multi
+    def _prepare_consolidated_interest_realization_move(
+        self, journal_id, date_move, company_id
+    ):
+        obj_move = self.env["account.move"]
+        obj_period = self.env["account.period"]
+        company = self.env["res.company"].browse(company_id)
+        # Line values are prepared before the move exists
+        move = obj_move.browse()
+        lines = []
+        for schedule in self:
+            lines.append(schedule._prepare_interest_realization_move_line(move))
+            lines.append(schedule._prepare_interest_income_move_line(move))
+        for line_data in lines:
+            del line_data["move_id"]
+        return {
+            "name": "/",
+            "journal_id": journal_id,
+            "date": date_move,
+            "ref": _("Interest realization %s") % date_move,
+            "period_id": obj_period._find_loan_period(date_move, company).id,
+            "company_id": company_id,
+            "line_id": [(0, 0, line_data) for line_data in lines],
+        }
+
     @api.multi
     def _get_realization_move_line_amount(self):
         self.ensure_one()
@@ -231,31 +348,23 @@ class LoanPaymentScheduleCommon(models.AbstractModel):
         return debit, credit
 
     @api.multi
-    def _get_realization_move_line_account(self):
+    def _get_realization_move_line_account(self, long_term=None):
         self.ensure_one()
-        dt_today = datetime.now()
         loan = self.loan_id
-        dt_schedule = datetime.strptime(self.schedule_date, "%Y-%m-%d")
-        account = False
-        if abs((dt_schedule - dt_today).days) > 365:
-            account = loan.type_id.long_account_principle_id
-            if not account:
-                msg = _("No long-term principle account defined")
-                raise UserError(msg)
-        else:
-            account = loan.type_id.short_account_principle_id
-            if not account:
-                msg = _("No short-term principle account defined")
-                raise UserError(msg)
-        return account
+        if long_term is None:
+            long_term = self.schedule_date > loan._get_principle_account_boundary()
+        profile = loan._get_accounting_profile()
+        if long_term:
+            return profile.long_account_principle_id
+        return profile.short_account_principle_id
 
     @api.multi
-    def _prepare_principle_receivable_move_line(self, move):
+    def _prepare_principle_receivable_move_line(self, move, long_term=None):
         self.ensure_one()
         loan = self.loan_id
         name = _("%s %s principle receivable") % (loan.name, self.schedule_date)
         debit, credit = self._get_realization_move_line_amount()
-        account = self._get_realization_move_line_account()
+        account = self._get_realization_move_line_account(long_term)
         res = {
             "move_id": move.id,
             "name": name,
@@ -274,6 +383,7 @@ class LoanPaymentScheduleCommon(models.AbstractModel):
             self._prepare_principle_receivable_move_line(move)
         )
         self.principle_move_line_id = line
+        self.env["loan.move_line_link"]._register([(line, self, "principle")])
 
     @api.multi
     def _get_interest_realization_move_line_amount(self):
@@ -290,7 +400,7 @@ class LoanPaymentScheduleCommon(models.AbstractModel):
     def _prepare_interest_realization_move_line(self, move):
         self.ensure_one()
         loan = self.loan_id
-        loan_type = loan.type_id
+        profile = loan._get_accounting_profile()
         name = _("%s %s interest receivable") % (loan.name, self.schedule_date)
 
         debit, credit = self._get_interest_realization_move_line_amount()
@@ -298,7 +408,7 @@ class LoanPaymentScheduleCommon(models.AbstractModel):
         res = {
             "move_id": move.id,
             "name": name,
-            "account_id": loan_type.account_interest_id.id,
+            "account_id": profile.account_interest_id.id,
             "debit": debit,
             "credit": credit,
             "date_maturity": self.schedule_date,
@@ -321,13 +431,7 @@ class LoanPaymentScheduleCommon(models.AbstractModel):
     def _get_interest_income_account(self):
         self.ensure_one()
         loan = self.loan_id
-        account = loan.type_id.account_interest_income_id
-
-        if not account:
-            msg = _("No interest income account defined")
-            raise UserError(msg)
-
-        return account
+        return loan._get_accounting_profile().account_interest_income_id
 
     @api.multi
     def _prepare_interest_income_move_line(self, move):
@@ -347,7 +451,11 @@ class LoanPaymentScheduleCommon(models.AbstractModel):
         return res
 
     @api.multi
+    @instrumented("action_long_to_short_term")
     def action_long_to_short_term(self):
+        loans = self.mapped("loan_id")
+        if loans._enqueue_job("action_long_to_short_term", self):
+            return
         for schedule in self:
             if not schedule._check_account_long_to_short_conversion():
                 msg = _("Can not convert long term into short term")
@@ -355,17 +463,163 @@ class LoanPaymentScheduleCommon(models.AbstractModel):
             schedule.write(schedule._prepare_long_to_short_term())
             schedule._reconcile_long_short()
 
+    @api.model
+    def reclassify_long_to_short_term(self, batch_size=500, commit=True, date=False):
+        """Move principle receivables that fall due within a year of date
+        (today by default) from the long-term into the short-term
+        principle account
+        """
+        if not date:
+            date = fields.Date.context_today(self)
+        dt_horizon = fields.Date.from_string(date) + timedelta(days=365)
+        horizon = fields.Date.to_string(dt_horizon)
+        account_ids = self.env["loan.type"]._get_long_account_principle_ids()
+        last_id = 0
+        while account_ids:
+            schedules = self._search_long_to_short_term_batch(
+                horizon, account_ids, last_id, batch_size
+            )
+            if not schedules:
+                break
+            last_id = schedules[-1].id
+            schedules = schedules.filtered(
+                lambda r: r._check_account_long_to_short_conversion()
+            )
+            time_start = time.time()
+            try:
+                schedules._reclassify_long_to_short_term()
+                if commit:
+                    self.env.cr.commit()  # pylint: disable=invalid-commit
+            except Exception:
+                if not commit:
+                    raise
+                self.env.cr.rollback()
+                self.env.invalidate_all()
+                _logger.exception(
+                    "Failed to reclassify %s %s", self._name, schedules.ids
+                )
+                continue
+            _logger.info(
+                "%s long to short term reclassification: %d schedules in %.3fs",
+                self._name,
+                len(schedules),
+                time.time() - time_start,
+            )
+
+    @api.model
+    def _search_long_to_short_term_batch(self, horizon, account_ids, last_id, limit):
+        query = (
+            """
+            SELECT a.id
+            FROM %s AS a
+            JOIN account_move_line AS b ON b.id = a.principle_move_line_id
+            WHERE a.state = 'active'
+            AND a.schedule_date <= %%s
+            AND b.account_id IN %%s
+            AND a.id > %%s
+            ORDER BY a.id
+            LIMIT %%s
+            """
+            % self._table
+        )
+        self.env.cr.execute(query, (horizon, tuple(account_ids), last_id, limit))
+        return self.browse([row[0] for row in self.env.cr.fetchall()])
+
+    @api.multi
+    def _reclassify_long_to_short_term(self):
+        obj_move = self.env["account.move"]
+        obj_link = self.env["loan.move_line_link"]
+        groups = {}
+        for schedule in self:
+            key = schedule._get_long_to_short_term_key()
+            groups.setdefault(key, []).append(schedule.id)
+
+        for (journal_id, date_move, company_id), schedule_ids in groups.items():
+            schedules = self.browse(schedule_ids)
+            move = obj_move.create(
+                schedules._prepare_long_to_short_term_move(
+                    journal_id, date_move, company_id
+                )
+            )
+            # Every schedule adds its short-term line then its long-term
+            # line, in the order of the commands
+            lines = move.line_id.sorted(key=lambda line: line.id)
+            links = []
+            old_lines = self.env["account.move.line"]
+            long_lines = self.env["account.move.line"]
+            for schedule, short_line, long_line in zip(
+                schedules, lines[0::2], lines[1::2]
+            ):
+                old_line = schedule.principle_move_line_id
+                schedule.write(
+                    {
+                        "principle_move_line_id": short_line.id,
+                        "old_principle_move_line_id": old_line.id,
+                    }
+                )
+                links.append((short_line, schedule, "principle"))
+                links.append((long_line, schedule, "long_term"))
+                old_lines += old_line
+                long_lines += long_line
+            obj_link._register(links)
+            obj_link._replace_role(old_lines, "principle", "old_principle")
+            self._reconcile_long_short_lines(old_lines + long_lines)
+
+    @api.model
+    def _reconcile_long_short_lines(self, move_lines):
+        # Every old line is cleared by the long-term line of the same
+        # amount, so the lines of a partner and account balance and are
+        # reconciled together instead of pair by pair
+        groups = {}
+        for line in move_lines:
+            key = (line.partner_id.id, line.account_id.id)
+            groups.setdefault(key, []).append(line.id)
+        obj_line = self.env["account.move.line"]
+        for line_ids in groups.values():
+            obj_line.browse(line_ids).reconcile_partial()
+
+    @api.multi
+    def _get_long_to_short_term_key(self):
+        self.ensure_one()
+        return (
+            self._get_interest_realization_journal().id,
+            self.schedule_date,
+            self.loan_id.company_id.id,
+        )
+
+    @api.multi
+    def _prepare_long_to_short_term_move(self, journal_id, date_move, company_id):
+        obj_move = self.env["account.move"]
+        obj_period = self.env["account.period"]
+        company = self.env["res.company"].browse(company_id)
+        # Line values are prepared before the move exists
+        move = obj_move.browse()
+        lines = []
+        for schedule in self:
+            lines.append(schedule._prepare_short_new_principle_move_line(move))
+            lines.append(schedule._prepare_long_new_principle_move_line(move))
+        for line_data in lines:
+            del line_data["move_id"]
+        if len(self) == 1:
+            ref = self.loan_id.name
+        else:
+            ref = _("Long to short term reclassification %s") % date_move
+        return {
+            "name": "/",
+            "journal_id": journal_id,
+            "date": date_move,
+            "ref": ref,
+            "period_id": obj_period._find_loan_period(date_move, company).id,
+            "company_id": company_id,
+            "line_id": [(0, 0, line_data) for line_data in lines],
+        }
+
     @api.multi
     def _reconcile_long_short(self):
         self.ensure_one()
-        obj_line = self.env["account.move.line"]
+        obj_link = self.env["loan.move_line_link"]
         old_line = self.old_principle_move_line_id
-        account = old_line.account_id
-        criteria = [
-            ("move_id", "=", self.principle_move_id.id),
-            ("account_id", "=", account.id),
-        ]
-        target_line = obj_line.search(criteria)[0]
+        target_line = obj_link._get_move_lines(self, "long_term")[-1]
         (old_line + target_line).reconcile_partial()
         return True
 
@@ -374,6 +628,9 @@ class LoanPaymentScheduleCommon(models.AbstractModel):
         self.ensure_one()
         old_move_line = self.principle_move_line_id
         new_move_line = self._create_new_principle_move_line()
+        self.env["loan.move_line_link"]._replace_role(
+            old_move_line, "principle", "old_principle"
+        )
         res = {
             "principle_move_line_id": new_move_line.id,
             "old_principle_move_line_id": old_move_line.id,
@@ -387,20 +644,20 @@ class LoanPaymentScheduleCommon(models.AbstractModel):
         obj_line = self.env["account.move.line"]
         move = obj_move.create(self._prepare_new_principle_move())
         line = obj_line.create(self._prepare_short_new_principle_move_line(move))
-        obj_line.create(self._prepare_long_new_principle_move_line(move))
+        long_line = obj_line.create(self._prepare_long_new_principle_move_line(move))
+        self.env["loan.move_line_link"]._register(
+            [
+                (line, self, "principle"),
+                (long_line, self, "long_term"),
+            ]
+        )
         return line
 
     @api.multi
     def _get_interest_realization_journal(self):
         self.ensure_one()
         loan = self.loan_id
-        journal = loan.type_id.realization_journal_id
-
-        if not journal:
-            msg = _("No interest realization journal defined")
-            raise UserError(msg)
-
-        return journal
+        return loan._get_accounting_profile().realization_journal_id
 
     @api.multi
     def _prepare_new_principle_move(self):
@@ -408,12 +665,13 @@ class LoanPaymentScheduleCommon(models.AbstractModel):
         date_entry = self.schedule_date
         loan = self.loan_id
         obj_period = self.env["account.period"]
+        period = obj_period._find_loan_period(date_entry, loan.company_id)
         res = {
             "name": "/",
             "journal_id": self._get_interest_realization_journal().id,
             "date": date_entry,
             "ref": loan.name,
-            "period_id": obj_period.find(date_entry)[0].id,
+            "period_id": period.id,
         }
         return res
 
@@ -421,13 +679,7 @@ class LoanPaymentScheduleCommon(models.AbstractModel):
     def _get_short_term_principle_account(self):
         self.ensure_one()
         loan = self.loan_id
-        account = loan.type_id.short_account_principle_id
-
-        if not account:
-            msg = _("No short-term principle account defined")
-            raise UserError(msg)
-
-        return account
+        return loan._get_accounting_profile().short_account_principle_id
 
     @api.multi
     def _prepare_short_new_principle_move_line(self, move):
@@ -449,13 +701,7 @@ class LoanPaymentScheduleCommon(models.AbstractModel):
     def _get_long_term_principle_account(self):
         self.ensure_one()
         loan = self.loan_id
-        account = loan.type_id.long_account_principle_id
-
-        if not account:
-            msg = _("No long-term principle account defined")
-            raise UserError(msg)
-
-        return account
+        return loan._get_accounting_profile().long_account_principle_id
 
     @api.multi
     def _prepare_long_new_principle_move_line(self, move):
@@ -479,19 +725,223 @@ class LoanPaymentScheduleCommon(models.AbstractModel):
         check = True
         if (
             self.principle_move_line_id.account_id
-            != self.loan_id.type_id.long_account_principle_id
+            != self.loan_id._get_accounting_profile().long_account_principle_id
         ):
             check = False
         return check
 
     @api.model
-    def realize_interest_income(self):
-        model_name = self._name
+    def realize_interest_income(
+        self,
+        batch_size=500,
+        commit=True,
+        partition_count=1,
+        partition_index=0,
+        company_ids=False,
+    ):
+        """Realize interest of every due schedule
+
+        Due schedules can be split by company and by id modulo
+        partition_count, so several crons can each run one partition at
+        the same time. A cron of partition 0 of 4 runs with the arguments
+        ``(500, True, 4, 0)``, the next one with ``(500, True, 4, 1)``
+        and so on. A partition that is already running elsewhere is
+        skipped.
+
+        Every batch locks its schedules with FOR UPDATE SKIP LOCKED, so
+        crons with a different partition count, or a manual run, never
+        realize the same schedule twice.
+        """
+        # Users only read the watermarks, the run keeps them up to date
+        obj_watermark = self.env["loan.interest_realization_watermark"].sudo()
+        obj_company = self.env["res.company"]
+        run_date = datetime.now().strftime("%Y-%m-%d")
+        if company_ids:
+            companies = obj_company.browse(company_ids)
+        else:
+            companies = obj_company.search([])
+        for company in companies:
+            watermark = obj_watermark._get_watermark(
+                company, self._name, partition_count, partition_index
+            )
+            if commit:
+                self.env.cr.commit()  # pylint: disable=invalid-commit
+            if not watermark:
+                _logger.info(
+                    "Interest realization partition %s/%s of company %s is "
+                    "being created by another worker, skipped",
+                    partition_index,
+                    partition_count,
+                    company.id,
+                )
+                continue
+            if not watermark._try_lock():
+                _logger.info(
+                    "Interest realization partition %s is locked, skipped",
+                    watermark._get_lock_key(),
+                )
+                continue
+            try:
+                self._realize_interest_income_partition(
+                    watermark, run_date, batch_size, commit
+                )
+            finally:
+                watermark._unlock()
 
-        criteria = [
-            ("schedule_date", "<=", datetime.now().strftime("%Y-%m-%d")),
-            ("state", "=", "active"),
+    @api.model
+    def _realize_interest_income_partition(
+        self, watermark, run_date, batch_size, commit
+    ):
+        time_start = watermark._start_run(run_date)
+        if commit:
+            self.env.cr.commit()  # pylint: disable=invalid-commit
+        while True:
+            try:
+                schedules = self._search_interest_realization_batch(
+                    watermark, run_date, batch_size
+                )
+            except TransactionRollbackError:
+                if not commit:
+                    raise
+                # Another worker realized a schedule of the batch after
+                # this transaction started, start over with a new one
+                self.env.cr.rollback()
+                self.env.invalidate_all()
+                continue
+            if not schedules:
+                break
+            processed_count, failed_count = schedules._realize_interest_income_batch()
+            time_start = watermark._advance(
+                schedules[-1], processed_count, failed_count, time_start
+            )
+            if commit:
+                self.env.cr.commit()  # pylint: disable=invalid-commit
+        watermark._finish_run(time_start)
+        _logger.info(
+            "Interest realization partition %s: %d schedules, %d failed, %.3fs",
+            watermark._get_lock_key(),
+            watermark.processed_count,
+            watermark.failed_count,
+            watermark.elapsed,
+        )
+
+    @api.model
+    def _search_interest_realization_batch(self, watermark, run_date, limit):
+        # Active, due schedules without interest entry, matched by the
+        # partial index on (state, schedule_date). Schedules locked by
+        # another worker are left to that worker.
+        where = [
+            "company_id = %s",
+            "state = 'active'",
+            "schedule_date <= %s",
+            "interest_move_line_id IS NULL",
         ]
-        obj_schedule = self.env[model_name]
-        schedules = obj_schedule.search(criteria)
-        schedules.action_realize_interest()
+        params = [watermark.company_id.id, run_date]
+        if watermark.partition_count > 1:
+            where.append("id %% %s = %s")
+            params += [watermark.partition_count, watermark.partition_index]
+        if watermark.schedule_date:
+            where.append("(schedule_date, id) > (%s, %s)")
+            params += [watermark.schedule_date, watermark.schedule_id]
+        query = """
+            SELECT id
+            FROM %s
+            WHERE %s
+            ORDER BY schedule_date, id
+            LIMIT %%s
+            FOR UPDATE SKIP LOCKED
+        """ % (
+            self._table,
+            " AND ".join(where),
+        )
+        self.env.cr.execute(query, params + [limit])
+        return self.browse([row[0] for row in self.env.cr.fetchall()])
+
+    @api.multi
+    def _realize_interest_selection(
+        self,
+        date_realization=False,
+        chunk_size=200,
+        commit=False,
+        raise_on_failure=False,
+    ):
+        """Realize the interest of a selection of schedules in chunks
+
+        Schedules already realized are skipped. The others are grouped
+        by loan type, journal, date and company so a chunk can share
+        one consolidated entry, and every chunk is committed on its own
+        when commit is set, which only background jobs do. Returns a
+        summary of the run, or raises once every chunk is done when
+        raise_on_failure is set and a schedule failed.
+        """
+        pending = self.filtered(lambda r: not r.interest_move_line_id)
+        groups = {}
+        failed_count = 0
+        for schedule in pending:
+            try:
+                key = (schedule.loan_id.type_id.id,) + (
+                    schedule._get_interest_consolidation_key(date_realization)
+                )
+            except UserError:
+                failed_count += 1
+                _logger.exception(
+                    "Failed to realize interest of %s %s", self._name, schedule.id
+                )
+                continue
+            groups.setdefault(key, []).append(schedule.id)
+
+        move_ids = []
+        realized_count = 0
+        for key in sorted(groups):
+            schedule_ids = groups[key]
+            for offset in range(0, len(schedule_ids), chunk_size):
+                chunk = self.browse(schedule_ids[offset : offset + chunk_size])
+                processed, failed = chunk._realize_interest_income_batch(
+                    date_realization
+                )
+                realized_count += processed
+                failed_count += failed
+                for move in chunk.mapped("interest_move_line_id.move_id"):
+                    if move.id not in move_ids:
+                        move_ids.append(move.id)
+                if commit:
+                    self.env.cr.commit()  # pylint: disable=invalid-commit
+        if raise_on_failure and failed_count:
+            msg = _("Interest realization failed for %s schedules") % failed_count
+            raise UserError(msg)
+        return {
+            "move_ids": move_ids,
+            "realized_count": realized_count,
+            "skipped_count": len(self) - len(pending),
+            "failed_count": failed_count,
+        }
+
+    @api.multi
+    def _realize_interest_income_batch(self, date_realization=False):
+        failed_count = 0
+        singles = self
+        consolidated = self._filter_interest_consolidation()
+        if consolidated:
+            try:
+                with self.env.cr.savepoint():
+                    consolidated.action_realize_interest(date_realization)
+                singles = self - consolidated
+            except Exception:
+                self.env.invalidate_all()
+                _logger.warning(
+                    "Consolidated interest realization of %s failed, "
+                    "retrying schedule by schedule",
+                    self._name,
+                    exc_info=True,
+                )
+        for schedule in singles:
+            try:
+                with self.env.cr.savepoint():
+                    schedule.action_realize_interest(date_realization)
+            except Exception:
+                self.env.invalidate_all()
+                failed_count += 1
+                _logger.exception(
+                    "Failed to realize interest of %s %s", self._name, schedule.id
+                )
+        return len(self) - failed_count, failed_count
@@ -2,10 +2,46 @@
 # Copyright 2019 OpenSynergy Indonesia
 # License LGPL-3.0 or later (http://www.gnu.org/licenses/lgpl).
 
-from datetime import datetime
+from collections import namedtuple
 
-from dateutil import relativedelta
-from openerp import api, fields, models
+from openerp import api, fields, models, tools
+from openerp.exceptions import Warning as UserError
+from openerp.tools.translate import _
+
+from . import amortization
+
+# Company dependent accounting configuration compiled by
+# loan.type._get_accounting_profile
+PROFILE_FIELDS = [
+    ("realization_journal_id", "account.journal"),
+    ("account_realization_id", "account.account"),
+    ("account_rounding_id", "account.account"),
+    ("interest_journal_id", "account.journal"),
+    ("account_interest_id", "account.account"),
+    ("account_interest_income_id", "account.account"),
+    ("short_account_principle_id", "account.account"),
+    ("long_account_principle_id", "account.account"),
+]
+
+# Every loan type field read by _get_accounting_profile
+PROFILE_FIELD_NAMES = [field_name for field_name, _comodel_name in PROFILE_FIELDS] + [
+    "interest_consolidation"
+]
+
+# Groups read by the workflow policy of loans, see
+# loan.common._get_policy_values
+POLICY_FIELDS = [
+    "loan_confirm_group_ids",
+    "loan_cancel_group_ids",
+    "loan_restart_group_ids",
+    "loan_restart_approval_group_ids",
+]
+
+AccountingProfile = namedtuple(
+    "AccountingProfile",
+    [field_name for field_name, _comodel_name in PROFILE_FIELDS]
+    + ["interest_consolidation"],
+)
 
 
 class LoanType(models.Model):
@@ -127,6 +163,13 @@ class LoanType(models.Model):
             ("type", "=", "other"),
         ],
     )
+    interest_consolidation = fields.Boolean(
+        string="Consolidate Interest Entries",
+        company_dependent=True,
+        help="Interest realized in the same run is posted as one journal "
+        "entry per journal, date and company instead of one journal entry "
+        "per payment schedule",
+    )
     short_account_principle_id = fields.Many2one(
         string="Short-Term Principle Account",
         comodel_name="account.account",
@@ -174,79 +217,130 @@ class LoanType(models.Model):
         column2="group_id",
     )
 
+    @api.model
+    def create(self, values):
+        result = super(LoanType, self).create(values)
+        self.clear_caches()
+        self._clear_loan_caches()
+        return result
+
+    @api.multi
+    def write(self, values):
+        result = super(LoanType, self).write(values)
+        cached_fields = PROFILE_FIELD_NAMES + POLICY_FIELDS
+        if any(field_name in values for field_name in cached_fields):
+            self.clear_caches()
+        if any(field_name in values for field_name in POLICY_FIELDS):
+            self._clear_loan_caches()
+        return result
+
+    @api.model
+    def _clear_loan_caches(self):
+        # clear_caches() only empties the cache of the model it is called
+        # on, the workflow policies are cached on every loan model
+        for model_name in ("loan.in", "loan.out"):
+            self.env[model_name].clear_caches()
+
+    @api.multi
+    def _get_accounting_profile(self, company):
+        """Return the accounting configuration of the loan type for company
+
+        Property values are read once per worker and kept until a loan
+        type changes, so posting does not look up ir.property per line.
+        """
+        self.ensure_one()
+        data = self._get_accounting_profile_data(self.id, company.id)
+        values = []
+        for (_field_name, comodel_name), res_id in zip(PROFILE_FIELDS, data[:-1]):
+            values.append(self.env[comodel_name].browse(res_id))
+        values.append(data[-1])
+        return AccountingProfile(*values)
+
+    @api.model
+    @tools.ormcache(skiparg=1)
+    def _get_accounting_profile_data(self, type_id, company_id):
+        loan_type = self.with_context(force_company=company_id).browse(type_id)
+        # Validated once here, so the getters of loans and schedules can
+        # use the profile as is
+        for field_name, _comodel_name in PROFILE_FIELDS:
+            if not loan_type[field_name]:
+                msg = _("No %s defined on loan type %s") % (
+                    loan_type._fields[field_name].string,
+                    loan_type.name,
+                )
+                raise UserError(msg)
+        data = [
+            loan_type[field_name].id for field_name, _comodel_name in PROFILE_FIELDS
+        ]
+        data.append(loan_type.interest_consolidation)
+        return tuple(data)
+
+    @api.model
+    def _get_long_account_principle_ids(self):
+        return self._get_property_res_ids("long_account_principle_id")
+
+    @api.model
+    @tools.ormcache(skiparg=1)
+    def _get_property_res_ids(self, field_name):
+        # Values of a company dependent many2one of every loan type in
+        # every company
+        self.env.cr.execute(
+            """
+            SELECT DISTINCT a.value_reference
+            FROM ir_property AS a
+            JOIN ir_model_fields AS b ON a.fields_id = b.id
+            WHERE b.model = 'loan.type'
+            AND b.name = %s
+            AND a.value_reference IS NOT NULL
+            """,
+            (field_name,),
+        )
+        return frozenset(int(row[0].split(",")[1]) for row in self.env.cr.fetchall())
+
+    @api.model
+    def _compute_interest_batch(
+        self,
+        loan_amounts,
+        interests,
+        periods,
+        first_payment_dates,
+        interest_methods,
+    ):
+        return amortization.compute_schedules(
+            loan_amounts,
+            interests,
+            periods,
+            first_payment_dates,
+            interest_methods,
+        )
+
     @api.model
     def _compute_interest(
         self, loan_amount, interest, period, first_payment_date, interest_method
     ):
-        if interest_method == "flat":
-            return self._compute_flat(loan_amount, interest, period, first_payment_date)
-        elif interest_method == "effective":
-            return self._compute_effective(
-                loan_amount, interest, period, first_payment_date
-            )
-        elif interest_method == "anuity":
-            return self._compute_anuity(
-                loan_amount, interest, period, first_payment_date
-            )
+        schedules = self._compute_interest_batch(
+            [loan_amount],
+            [interest],
+            [period],
+            [first_payment_date],
+            [interest_method],
+        )
+        return amortization.columns_to_rows(schedules[0])
 
     @api.model
     def _compute_flat(self, loan_amount, interest, period, first_payment_date):
-        result = []
-
-        principle_amount = loan_amount / period
-        interest_amount = (loan_amount * (interest / 100.00)) / 12.0
-        next_payment_date = datetime.strptime(first_payment_date, "%Y-%m-%d")
-        for _loan_period in range(1, period + 1):
-            res = {
-                "schedule_date": next_payment_date.strftime("%Y-%m-%d"),
-                "principle_amount": principle_amount,
-                "interest_amount": interest_amount,
-            }
-            result.append(res)
-            next_payment_date = next_payment_date + relativedelta.relativedelta(
-                months=+1
-            )
-        return result
+        return self._compute_interest(
+            loan_amount, interest, period, first_payment_date, "flat"
+        )
 
     @api.model
     def _compute_effective(self, loan_amount, interest, period, first_payment_date):
-        result = []
-        principle_amount = loan_amount / float(period)
-        interest_dec = interest / 100.00
-        for loan_period in range(1, period + 1):
-            period_before = loan_period - 1
-            interest_amount = (
-                (loan_amount - (period_before * principle_amount))
-                * interest_dec
-                / 12.00
-            )
-            res = {
-                "schedule_date": first_payment_date,
-                "principle_amount": principle_amount,
-                "interest_amount": interest_amount,
-            }
-            result.append(res)
-        return result
+        return self._compute_interest(
+            loan_amount, interest, period, first_payment_date, "effective"
+        )
 
     @api.model
     def _compute_anuity(self, loan_amount, interest, period, first_payment_date):
-        result = []
-        interest_decimal = interest / 100.00
-        total_principle_amount = 0.0
-        fixed_principle_amount = loan_amount * (
-            (interest_decimal / 12.0)
-            / (1.0 - (1.0 + (interest_decimal / 12.00)) ** -float(period))
+        return self._compute_interest(
+            loan_amount, interest, period, first_payment_date, "anuity"
         )
-        for _loan_period in range(1, period + 1):
-            interest_amount = (
-                (loan_amount - total_principle_amount) * interest_decimal / 12.00
-            )
-            principle_amount = fixed_principle_amount - interest_amount
-            res = {
-                "schedule_date": first_payment_date,
-                "principle_amount": principle_amount,
-                "interest_amount": interest_amount,
-            }
-            result.append(res)
-            total_principle_amount += principle_amount
-        return result
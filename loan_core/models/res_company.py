@@ -17,3 +17,17 @@ class ResCompany(models.Model):
         string="Loan Out Interest Realization Cron",
         comodel_name="ir.cron",
     )
+
+    loan_background_job = fields.Boolean(
+        string="Run Loan Actions in Background",
+        help="Payment schedule computation, approval, interest "
+        "realization and long to short term conversion started from the "
+        "user interface are queued as background jobs",
+    )
+
+    loan_operation_stat = fields.Boolean(
+        string="Record Loan Operation Statistics",
+        help="Query count, rows affected and wall time of loan operations "
+        "are logged and accumulated on Loan Operation Statistics. Adds "
+        "two queries per operation, leave it off unless profiling",
+    )
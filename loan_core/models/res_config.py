@@ -29,3 +29,11 @@ class ResConfig(models.TransientModel):
         comodel_name="ir.cron",
         related="company_id.cron_loan_out_interest_realization_id",
     )
+    loan_background_job = fields.Boolean(
+        string="Run Loan Actions in Background",
+        related="company_id.loan_background_job",
+    )
+    loan_operation_stat = fields.Boolean(
+        string="Record Loan Operation Statistics",
+        related="company_id.loan_operation_stat",
+    )
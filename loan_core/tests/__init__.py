@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+# Copyright 2019 OpenSynergy Indonesia
+# License LGPL-3.0 or later (http://www.gnu.org/licenses/lgpl).
+
+from . import (
+    test_account_period,
+    test_accounting_profile,
+    test_allowed_move_line,
+    test_amortization,
+    test_approval_queue,
+    test_approve,
+    test_compute_payment,
+    test_import_loans,
+    test_interest_consolidation,
+    test_interest_realization,
+    test_loan_completion,
+    test_loan_job,
+    test_loan_total,
+    test_move_line_link,
+    test_operation_stat,
+    test_payment_state,
+    test_policy,
+    test_principle_account,
+    test_realization_move,
+    test_realize_interest_wizard,
+    test_reclassification,
+    test_reconciliation,
+)
@@ -0,0 +1,276 @@
+# -*- coding: utf-8 -*-
+# Copyright 2019 OpenSynergy Indonesia
+# License LGPL-3.0 or later (http://www.gnu.org/licenses/lgpl).
+
+from datetime import date
+
+from dateutil import relativedelta
+
+from openerp.tests.common import TransactionCase
+
+INTEREST_METHODS = ["anuity", "flat", "effective"]
+
+
+class LoanSeeder(object):
+    """Accounting configuration, loan types and partners for loans
+
+    Shared by the tests and benchmarks/bench_lifecycle.py.
+    """
+
+    def __init__(self, env, tag, direction):
+        self.env = env
+        self.tag = tag
+        self.direction = direction
+        self.company = env.user.company_id
+        self.obj_loan = env["loan.%s" % direction]
+
+    def _account(self, suffix, name, type_xml_id, account_type="other", reconcile=True):
+        return self.env["account.account"].create(
+            {
+                "code": "%s%s" % (self.tag, suffix),
+                "name": "Loan Seed %s" % name,
+                "type": account_type,
+                "user_type": self.env.ref(type_xml_id).id,
+                "reconcile": reconcile,
+                "company_id": self.company.id,
+            }
+        )
+
+    def _journal(self, suffix, name):
+        return self.env["account.journal"].create(
+            {
+                "code": "%s%s" % (self.tag[-3:], suffix),
+                "name": "Loan Seed %s %s" % (name, self.tag),
+                "type": "general",
+                "company_id": self.company.id,
+            }
+        )
+
+    def seed_fiscal_years(self, date_start, date_stop):
+        obj_fiscal_year = self.env["account.fiscalyear"]
+        for year in range(date_start.year, date_stop.year + 1):
+            criteria = [
+                ("company_id", "=", self.company.id),
+                ("date_start", "<=", "%d-12-31" % year),
+                ("date_stop", ">=", "%d-01-01" % year),
+            ]
+            if obj_fiscal_year.search(criteria, limit=1):
+                continue
+            fiscal_year = obj_fiscal_year.create(
+                {
+                    "name": "%d" % year,
+                    "code": "%d" % year,
+                    "date_start": "%d-01-01" % year,
+                    "date_stop": "%d-12-31" % year,
+                    "company_id": self.company.id,
+                }
+            )
+            fiscal_year.create_period()
+
+    def seed_accounting(self):
+        self.accounts = {
+            "realization": self._account(
+                "RL", "Realization", "account.data_account_type_liability"
+            ),
+            "rounding": self._account(
+                "RD",
+                "Rounding",
+                "account.data_account_type_expense",
+                reconcile=False,
+            ),
+            "interest": self._account(
+                "IN", "Interest", "account.data_account_type_asset"
+            ),
+            "interest_income": self._account(
+                "II",
+                "Interest Income",
+                "account.data_account_type_income",
+                reconcile=False,
+            ),
+            "short_principle": self._account(
+                "SP", "Short-Term Principle", "account.data_account_type_asset"
+            ),
+            "long_principle": self._account(
+                "LP", "Long-Term Principle", "account.data_account_type_asset"
+            ),
+            "bank": self._account(
+                "BK",
+                "Bank",
+                "account.data_account_type_bank",
+                account_type="liquidity",
+                reconcile=False,
+            ),
+        }
+        self.journals = {
+            "realization": self._journal("R", "Realization"),
+            "interest": self._journal("I", "Interest"),
+            "payment": self._journal("P", "Payment"),
+        }
+
+    def seed_loan_types(
+        self, count, maximum_loan_amount, periods, methods=INTEREST_METHODS
+    ):
+        obj_type = self.env["loan.type"]
+        self.loan_types = obj_type.browse()
+        for index in range(count):
+            self.loan_types |= obj_type.create(
+                {
+                    "name": "Loan Seed %s %d" % (self.tag, index),
+                    "code": "%s%d" % (self.tag, index),
+                    "direction": self.direction,
+                    "interest_method": methods[index % len(methods)],
+                    "interest_amount": 12.0,
+                    "maximum_loan_amount": maximum_loan_amount,
+                    "maximum_installment_period": periods,
+                    "interest_consolidation": bool(index % 2),
+                    "realization_journal_id": self.journals["realization"].id,
+                    "interest_journal_id": self.journals["interest"].id,
+                    "account_realization_id": self.accounts["realization"].id,
+                    "account_rounding_id": self.accounts["rounding"].id,
+                    "account_interest_id": self.accounts["interest"].id,
+                    "account_interest_income_id": self.accounts["interest_income"].id,
+                    "short_account_principle_id": self.accounts["short_principle"].id,
+                    "long_account_principle_id": self.accounts["long_principle"].id,
+                }
+            )
+
+    def seed_partners(self, count):
+        obj_partner = self.env["res.partner"]
+        self.partners = obj_partner.browse()
+        for index in range(count):
+            self.partners |= obj_partner.create(
+                {
+                    "name": "Loan Seed Partner %s %d" % (self.tag, index),
+                    "is_company": True,
+                }
+            )
+
+    def create_loan(
+        self,
+        loan_type,
+        partner,
+        loan_amount,
+        period,
+        first_payment_date,
+        date_realization,
+    ):
+        return self.obj_loan.create(
+            {
+                "partner_id": partner.id,
+                "type_id": loan_type.id,
+                "loan_amount": loan_amount,
+                "maximum_loan_amount": loan_type.maximum_loan_amount,
+                "interest": 12.0,
+                "manual_loan_period": period,
+                "maximum_installment_period": loan_type.maximum_installment_period,
+                "request_date": date_realization.strftime("%Y-%m-%d"),
+                "date_realization": date_realization.strftime("%Y-%m-%d"),
+                "first_payment_date": first_payment_date.strftime("%Y-%m-%d"),
+            }
+        )
+
+    def approve(self, loan):
+        loan.validate_tier()
+        # Without tier definitions there is nothing to validate
+        if loan.state == "confirm":
+            loan.action_approve()
+
+    def pay(self, loan, lines, date_payment):
+        """Post one payment entry clearing lines and reconcile them"""
+        date_payment = date_payment.strftime("%Y-%m-%d")
+        period = self.env["account.period"]._find_loan_period(
+            date_payment, loan.company_id
+        )
+        commands = []
+        balance = 0.0
+        for line in lines:
+            balance += line.debit - line.credit
+            commands.append(
+                (
+                    0,
+                    0,
+                    {
+                        "name": line.name,
+                        "account_id": line.account_id.id,
+                        "partner_id": line.partner_id.id,
+                        "debit": line.credit,
+                        "credit": line.debit,
+                    },
+                )
+            )
+        commands.append(
+            (
+                0,
+                0,
+                {
+                    "name": loan.name,
+                    "account_id": self.accounts["bank"].id,
+                    "debit": balance > 0.0 and balance or 0.0,
+                    "credit": balance < 0.0 and -balance or 0.0,
+                },
+            )
+        )
+        move = self.env["account.move"].create(
+            {
+                "journal_id": self.journals["payment"].id,
+                "period_id": period.id,
+                "date": date_payment,
+                "ref": loan.name,
+                "line_id": commands,
+            }
+        )
+        counterparts = move.line_id.sorted(key=lambda line: line.id)
+        for line, counterpart in zip(lines, counterparts):
+            (line | counterpart).reconcile()
+        return move
+
+
+class LoanTestCase(TransactionCase):
+    def setUp(self):
+        super(LoanTestCase, self).setUp()
+        self.today = date.today()
+        self.seeder = LoanSeeder(self.env, "LT", "out")
+        self.seeder.seed_fiscal_years(
+            self.today - relativedelta.relativedelta(years=1),
+            self.today + relativedelta.relativedelta(years=3),
+        )
+        self.seeder.seed_accounting()
+        self.seeder.seed_loan_types(1, 1000000.0, 36, methods=["flat"])
+        self.seeder.seed_partners(1)
+        self.company = self.seeder.company
+        self.obj_loan = self.seeder.obj_loan
+        self.loan_type = self.seeder.loan_types
+        self.partner = self.seeder.partners
+
+    def _create_loan(self, period=6, first_payment_date=False, loan_amount=1200.0):
+        if not first_payment_date:
+            first_payment_date = self.today + relativedelta.relativedelta(months=1)
+        return self.seeder.create_loan(
+            self.loan_type,
+            self.partner,
+            loan_amount,
+            period,
+            first_payment_date,
+            self.today,
+        )
+
+    def _approve_loan(self, loan):
+        loan.workflow_action_confirm()
+        self.seeder.approve(loan)
+
+    def _pay(self, loan, lines):
+        return self.seeder.pay(loan, lines, self.today)
+
+    def _activate_loan(self, loan):
+        self._approve_loan(loan)
+        self._pay(loan, [loan.move_line_header_id])
+        loan.invalidate_cache()
+
+    def _create_employee(self, login):
+        return self.env["res.users"].create(
+            {
+                "name": "Loan Test %s" % login,
+                "login": login,
+                "groups_id": [(6, 0, [self.env.ref("base.group_user").id])],
+            }
+        )
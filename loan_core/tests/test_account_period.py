@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+# Copyright 2019 OpenSynergy Indonesia
+# License LGPL-3.0 or later (http://www.gnu.org/licenses/lgpl).
+
+import mock
+
+from .common import LoanTestCase
+
+
+class TestAccountPeriod(LoanTestCase):
+    def setUp(self):
+        super(TestAccountPeriod, self).setUp()
+        self.obj_period = self.env["account.period"]
+        self.date = self.today.strftime("%Y-%m-%d")
+
+    def test_find_loan_period(self):
+        period = self.obj_period._find_loan_period(self.date, self.company)
+        expected = self.obj_period.with_context(company_id=self.company.id).find(
+            self.date
+        )[0]
+        self.assertEqual(period, expected)
+        self.assertEqual(
+            self.obj_period._find_loan_period(self.today, self.company), period
+        )
+
+    def test_find_loan_period_cached(self):
+        self.obj_period._find_loan_period(self.date, self.company)
+        with mock.patch.object(self.obj_period.__class__, "find") as find:
+            self.obj_period._find_loan_period(self.date, self.company)
+            self.assertFalse(find.called)
+
+    def test_period_write_clears_cache(self):
+        period = self.obj_period._find_loan_period(self.date, self.company)
+        period.write(
+            {
+                "name": period.name,
+            }
+        )
+        with mock.patch.object(
+            self.obj_period.__class__, "find", return_value=period
+        ) as find:
+            self.obj_period._find_loan_period(self.date, self.company)
+            self.assertTrue(find.called)
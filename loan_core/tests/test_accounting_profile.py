@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+# Copyright 2019 OpenSynergy Indonesia
+# License LGPL-3.0 or later (http://www.gnu.org/licenses/lgpl).
+
+from openerp.exceptions import Warning as UserError
+
+from .common import LoanTestCase
+
+
+class TestAccountingProfile(LoanTestCase):
+    def _get_profile(self):
+        return self.loan_type._get_accounting_profile(self.company)
+
+    def _get_property(self, field_name):
+        return self.env["ir.property"].search(
+            [
+                ("fields_id.model", "=", "loan.type"),
+                ("fields_id.name", "=", field_name),
+                ("res_id", "=", "loan.type,%d" % self.loan_type.id),
+            ]
+        )
+
+    def test_profile(self):
+        profile = self._get_profile()
+        accounts = self.seeder.accounts
+        self.assertEqual(profile.account_realization_id, accounts["realization"])
+        self.assertEqual(profile.long_account_principle_id, accounts["long_principle"])
+        self.assertEqual(profile.interest_journal_id, self.seeder.journals["interest"])
+        self.assertFalse(profile.interest_consolidation)
+
+    def test_missing_account(self):
+        self.loan_type.write(
+            {
+                "account_rounding_id": False,
+            }
+        )
+        with self.assertRaises(UserError):
+            self._get_profile()
+        loan = self._create_loan(period=6)
+        with self.assertRaises(UserError):
+            loan._get_rounding_account()
+
+    def test_type_write_clears_cache(self):
+        self._get_profile()
+        self.loan_type.write(
+            {
+                "account_rounding_id": self.seeder.accounts["interest_income"].id,
+            }
+        )
+        self.assertEqual(
+            self._get_profile().account_rounding_id,
+            self.seeder.accounts["interest_income"],
+        )
+
+    def test_property_write_clears_cache(self):
+        self._get_profile()
+        account = self.seeder.accounts["interest_income"]
+        self._get_property("account_rounding_id").write(
+            {
+                "value_reference": "account.account,%d" % account.id,
+            }
+        )
+        self.assertEqual(self._get_profile().account_rounding_id, account)
+
+    def test_property_unlink_clears_cache(self):
+        self._get_profile()
+        self._get_property("account_rounding_id").unlink()
+        with self.assertRaises(UserError):
+            self._get_profile()
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+# Copyright 2019 OpenSynergy Indonesia
+# License LGPL-3.0 or later (http://www.gnu.org/licenses/lgpl).
+
+from .common import LoanTestCase
+
+
+class TestAllowedMoveLine(LoanTestCase):
+    def setUp(self):
+        super(TestAllowedMoveLine, self).setUp()
+        self.loan = self._create_loan(period=6)
+        self.move_lines = self.env["account.move.line"].browse()
+        for _index in range(3):
+            self.move_lines |= self._create_payment()
+
+    def _create_payment(self):
+        date_payment = self.today.strftime("%Y-%m-%d")
+        period = self.env["account.period"]._find_loan_period(
+            date_payment, self.company
+        )
+        move = self.env["account.move"].create(
+            {
+                "journal_id": self.seeder.journals["payment"].id,
+                "period_id": period.id,
+                "date": date_payment,
+                "line_id": [
+                    (
+                        0,
+                        0,
+                        {
+                            "name": "Loan Payment",
+                            "account_id": self.seeder.accounts["realization"].id,
+                            "partner_id": self.partner.id,
+                            "debit": 100.0,
+                        },
+                    ),
+                    (
+                        0,
+                        0,
+                        {
+                            "name": "Loan Payment",
+                            "account_id": self.seeder.accounts["bank"].id,
+                            "credit": 100.0,
+                        },
+                    ),
+                ],
+            }
+        )
+        return move.line_id.filtered(lambda r: r.debit > 0.0)
+
+    def test_allowed_move_lines(self):
+        self.assertEqual(self.loan.allowed_move_line_ids, self.move_lines)
+
+    def test_paging(self):
+        move_line_ids = self.loan._get_allowed_move_line_ids()
+        self.assertEqual(sorted(move_line_ids), sorted(self.move_lines.ids))
+        first_page = self.loan._get_allowed_move_line_ids(offset=0, limit=2)
+        second_page = self.loan._get_allowed_move_line_ids(offset=2, limit=2)
+        self.assertEqual(len(first_page), 2)
+        self.assertEqual(first_page + second_page, move_line_ids)
+        loan = self.loan.with_context(
+            allowed_move_line_offset=2,
+            allowed_move_line_limit=2,
+        )
+        self.assertEqual(loan.allowed_move_line_ids.ids, second_page)
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+# Copyright 2019 OpenSynergy Indonesia
+# License LGPL-3.0 or later (http://www.gnu.org/licenses/lgpl).
+
+from openerp.tests.common import BaseCase, TransactionCase
+
+from ..models import amortization
+
+
+class TestAmortization(BaseCase):
+    def test_monthly_dates_clamp_month_end(self):
+        dates = amortization.monthly_dates("2020-01-31", 4)
+        self.assertEqual(
+            dates,
+            ["2020-01-31", "2020-02-29", "2020-03-31", "2020-04-30"],
+        )
+
+    def test_monthly_dates_no_drift(self):
+        # A short month does not pull the following dates back
+        dates = amortization.monthly_dates("2021-01-30", 3)
+        self.assertEqual(dates, ["2021-01-30", "2021-02-28", "2021-03-30"])
+
+    def test_monthly_dates_year_boundary(self):
+        dates = amortization.monthly_dates("2020-11-15", 3)
+        self.assertEqual(dates, ["2020-11-15", "2020-12-15", "2021-01-15"])
+
+    def test_compute_schedules_flat(self):
+        schedules = amortization.compute_schedules(
+            [1200.0], [12.0], [3], ["2020-01-31"], ["flat"]
+        )
+        columns = schedules[0]
+        self.assertEqual(columns["principle_amount"], [400.0, 400.0, 400.0])
+        self.assertEqual(columns["interest_amount"], [12.0, 12.0, 12.0])
+        self.assertEqual(
+            columns["schedule_date"], ["2020-01-31", "2020-02-29", "2020-03-31"]
+        )
+
+    def test_compute_schedules_principle_total(self):
+        methods = ["flat", "effective", "anuity"]
+        schedules = amortization.compute_schedules(
+            [10000.0] * 3, [12.0] * 3, [12] * 3, ["2020-01-15"] * 3, methods
+        )
+        for method, columns in zip(methods, schedules):
+            self.assertEqual(len(columns["schedule_date"]), 12, method)
+            self.assertAlmostEqual(
+                sum(columns["principle_amount"]), 10000.0, places=6, msg=method
+            )
+
+    def test_compute_schedules_unknown_method(self):
+        schedules = amortization.compute_schedules(
+            [1200.0], [12.0], [3], ["2020-01-31"], ["unknown"]
+        )
+        self.assertIsNone(schedules[0])
+
+    def test_columns_to_rows(self):
+        schedules = amortization.compute_schedules(
+            [1200.0], [12.0], [3], ["2020-01-31"], ["flat"]
+        )
+        rows = amortization.columns_to_rows(schedules[0])
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(
+            rows[1],
+            {
+                "schedule_date": "2020-02-29",
+                "principle_amount": 400.0,
+                "interest_amount": 12.0,
+            },
+        )
+        self.assertIsNone(amortization.columns_to_rows(None))
+
+
+class TestLoanTypeInterest(TransactionCase):
+    def test_compute_interest_wrappers(self):
+        obj_type = self.env["loan.type"]
+        for method in ("flat", "effective", "anuity"):
+            rows = getattr(obj_type, "_compute_%s" % method)(
+                1200.0, 12.0, 4, "2020-01-31"
+            )
+            schedules = amortization.compute_schedules(
+                [1200.0], [12.0], [4], ["2020-01-31"], [method]
+            )
+            self.assertEqual(rows, amortization.columns_to_rows(schedules[0]))
+            self.assertEqual(
+                [row["schedule_date"] for row in rows],
+                ["2020-01-31", "2020-02-29", "2020-03-31", "2020-04-30"],
+            )
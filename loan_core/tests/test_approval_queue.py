@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+# Copyright 2019 OpenSynergy Indonesia
+# License LGPL-3.0 or later (http://www.gnu.org/licenses/lgpl).
+
+import mock
+
+from openerp.exceptions import Warning as UserError
+
+from .common import LoanTestCase
+
+
+class TestApprovalQueue(LoanTestCase):
+    def setUp(self):
+        super(TestApprovalQueue, self).setUp()
+        self.loans = self.obj_loan.browse()
+        for _index in range(4):
+            self.loans |= self._create_loan(period=6)
+        self.loans.workflow_action_confirm()
+
+    def _patch_realization_move(self, failing_loan):
+        loan_class = self.obj_loan.__class__
+        create_realization_move = loan_class._create_realization_move
+
+        def _create_realization_move(loan):
+            if loan == failing_loan:
+                raise UserError("Realization move failed")
+            return create_realization_move(loan)
+
+        return mock.patch.object(
+            loan_class, "_create_realization_move", _create_realization_move
+        )
+
+    def test_confirm(self):
+        for loan in self.loans:
+            self.assertEqual(loan.state, "confirm")
+            self.assertTrue(loan.confirm_date)
+            self.assertEqual(loan.confirm_uid, self.env.user)
+
+    def test_process_queue(self):
+        self.loans._enqueue_approval()
+        self.assertEqual(self.loans.mapped("approval_queued"), [True])
+        self.assertEqual(self.loans.mapped("approval_uid"), self.env.user)
+        result = self.obj_loan.process_approval_queue(chunk_size=3, commit=False)
+        self.assertEqual(len(result), 2)
+        for loan in self.loans:
+            self.assertEqual(loan.state, "approve")
+            self.assertFalse(loan.approval_queued)
+            self.assertFalse(loan.approval_uid)
+
+    def test_failing_loan_does_not_block_chunk(self):
+        self.loans._enqueue_approval()
+        failing_loan = self.loans[1]
+        with self._patch_realization_move(failing_loan):
+            result = self.obj_loan.process_approval_queue(chunk_size=4, commit=False)
+        self.assertEqual(len(result), 1)
+        self.assertTrue(result[0]["failed"])
+        self.assertEqual(result[0]["failed_loan_ids"], failing_loan.ids)
+        self.assertEqual(failing_loan.state, "confirm")
+        self.assertFalse(failing_loan.approval_queued)
+        self.assertIn("Realization move failed", failing_loan.approval_error)
+        for loan in self.loans - failing_loan:
+            self.assertEqual(loan.state, "approve")
+            self.assertTrue(loan.move_realization_id)
+        # The failing loan left the queue, the next run has nothing to do
+        self.assertFalse(self.obj_loan.process_approval_queue(commit=False))
+
+    def test_requeue_clears_error(self):
+        failing_loan = self.loans[0]
+        with self._patch_realization_move(failing_loan):
+            failing_loan.action_approve_batch(commit=False)
+        self.assertTrue(failing_loan.approval_error)
+        failing_loan._enqueue_approval()
+        self.assertFalse(failing_loan.approval_error)
+        self.obj_loan.process_approval_queue(commit=False)
+        self.assertEqual(failing_loan.state, "approve")
+
+    def test_tier_evaluations(self):
+        definitions = self.env["tier.definition"].search(
+            [("model", "=", self.obj_loan._name)]
+        )
+        evaluations = self.loans._get_tier_evaluations()
+        self.assertLessEqual(set(evaluations), set(definitions.ids))
+        for loan_ids in evaluations.values():
+            self.assertLessEqual(loan_ids, set(self.loans.ids))
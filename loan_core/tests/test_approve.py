@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+# Copyright 2019 OpenSynergy Indonesia
+# License LGPL-3.0 or later (http://www.gnu.org/licenses/lgpl).
+
+from .common import LoanTestCase
+
+
+class TestApprove(LoanTestCase):
+    def _create_confirmed_loans(self, count):
+        loans = self.obj_loan.browse()
+        for _index in range(count):
+            loans |= self._create_loan(period=6)
+        loans.workflow_action_confirm()
+        return loans
+
+    def test_approve_batch(self):
+        loans = self._create_confirmed_loans(5)
+        result = loans.action_approve_batch(chunk_size=2, commit=False)
+        self.assertEqual(len(result), 3)
+        self.assertEqual(result[0]["loan_ids"], loans.ids[:2])
+        self.assertFalse(any(stat["failed"] for stat in result))
+        for loan in loans:
+            self.assertEqual(loan.state, "approve")
+            self.assertEqual(len(loan.payment_schedule_ids), 6)
+            self.assertTrue(loan.move_realization_id)
+            self.assertEqual(loan.move_line_header_id.move_id, loan.move_realization_id)
+            self.assertEqual(loan.approve_uid, self.env.user)
+
+    def test_approve_schedules_linked(self):
+        loans = self._create_confirmed_loans(2)
+        loans.action_approve_batch(commit=False)
+        for loan in loans:
+            for schedule in loan.payment_schedule_ids:
+                line = schedule.principle_move_line_id
+                self.assertEqual(line.move_id, loan.move_realization_id)
+                self.assertEqual(line.date_maturity, schedule.schedule_date)
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+# Copyright 2019 OpenSynergy Indonesia
+# License LGPL-3.0 or later (http://www.gnu.org/licenses/lgpl).
+
+from .common import LoanTestCase
+
+
+class TestComputePayment(LoanTestCase):
+    def test_payment_datas_match_loan_type(self):
+        loan = self._create_loan(period=6)
+        payment_datas = loan._get_payment_datas()
+        expected = self.loan_type._compute_interest(
+            loan.loan_amount,
+            loan.interest,
+            loan.manual_loan_period,
+            loan.first_payment_date,
+            self.loan_type.interest_method,
+        )
+        self.assertEqual(payment_datas[loan.id], expected)
+
+    def test_compute_payment(self):
+        loan = self._create_loan(period=6)
+        loan.action_compute_payment()
+        schedules = loan.payment_schedule_ids
+        self.assertEqual(len(schedules), 6)
+        self.assertAlmostEqual(sum(schedules.mapped("principle_amount")), 1200.0)
+        self.assertEqual(
+            schedules.mapped("schedule_date"),
+            [row["schedule_date"] for row in loan._get_payment_datas()[loan.id]],
+        )
+
+    def test_recompute_keeps_schedules(self):
+        loan = self._create_loan(period=6)
+        loan.action_compute_payment()
+        schedule_ids = loan.payment_schedule_ids.ids
+        loan.write(
+            {
+                "loan_amount": 2400.0,
+            }
+        )
+        loan.action_compute_payment()
+        self.assertEqual(loan.payment_schedule_ids.ids, schedule_ids)
+        self.assertAlmostEqual(
+            sum(loan.payment_schedule_ids.mapped("principle_amount")), 2400.0
+        )
+
+    def test_recompute_shorter_period(self):
+        loan = self._create_loan(period=6)
+        loan.action_compute_payment()
+        schedule_ids = loan.payment_schedule_ids.ids
+        loan.write(
+            {
+                "manual_loan_period": 4,
+            }
+        )
+        loan.action_compute_payment()
+        self.assertEqual(loan.payment_schedule_ids.ids, schedule_ids[:4])
+        self.assertFalse(loan.payment_schedule_ids.browse(schedule_ids[4:]).exists())
+
+    def test_recompute_longer_period(self):
+        loan = self._create_loan(period=6)
+        loan.action_compute_payment()
+        schedule_ids = loan.payment_schedule_ids.ids
+        loan.write(
+            {
+                "manual_loan_period": 9,
+            }
+        )
+        loan.action_compute_payment()
+        schedules = loan.payment_schedule_ids
+        self.assertEqual(len(schedules), 9)
+        self.assertEqual(schedules.ids[:6], schedule_ids)
+        self.assertAlmostEqual(sum(schedules.mapped("principle_amount")), 1200.0)
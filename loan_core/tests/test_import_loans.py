@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+# Copyright 2019 OpenSynergy Indonesia
+# License LGPL-3.0 or later (http://www.gnu.org/licenses/lgpl).
+
+from dateutil import relativedelta
+
+from .common import LoanTestCase
+
+
+class TestImportLoans(LoanTestCase):
+    def _prepare_values(self, count):
+        first_payment_date = self.today + relativedelta.relativedelta(months=1)
+        values_list = []
+        for _index in range(count):
+            values_list.append(
+                {
+                    "partner_id": self.partner.id,
+                    "type_id": self.loan_type.id,
+                    "loan_amount": 1200.0,
+                    "manual_loan_period": 6,
+                    "request_date": self.today.strftime("%Y-%m-%d"),
+                    "date_realization": self.today.strftime("%Y-%m-%d"),
+                    "first_payment_date": first_payment_date.strftime("%Y-%m-%d"),
+                }
+            )
+        return values_list
+
+    def test_import(self):
+        loans = self.obj_loan.import_loans(
+            self._prepare_values(5), chunk_size=2, commit=False
+        )
+        self.assertEqual(len(loans), 5)
+        names = loans.mapped("name")
+        self.assertEqual(len(set(names)), 5)
+        self.assertNotIn("/", names)
+        self.assertEqual(loans.mapped("state"), ["draft"])
+        self.assertFalse(loans.mapped("payment_schedule_ids"))
+        for loan in loans:
+            self.assertEqual(loan.maximum_loan_amount, 1000000.0)
+            self.assertEqual(loan.interest, 12.0)
+
+    def test_import_compute_payment(self):
+        loans = self.obj_loan.import_loans(
+            self._prepare_values(3), compute_payment=True, chunk_size=2, commit=False
+        )
+        for loan in loans:
+            self.assertEqual(len(loan.payment_schedule_ids), 6)
+            self.assertAlmostEqual(loan.total_principle_amount, 1200.0)
+            self.assertEqual(loan.state, "draft")
+
+    def test_import_approve(self):
+        loans = self.obj_loan.import_loans(
+            self._prepare_values(3), approve=True, chunk_size=2, commit=False
+        )
+        self.assertEqual(loans.mapped("state"), ["approve"])
+        for loan in loans:
+            self.assertEqual(len(loan.payment_schedule_ids), 6)
+            self.assertTrue(loan.move_line_header_id)
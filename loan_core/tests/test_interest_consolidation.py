@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+# Copyright 2019 OpenSynergy Indonesia
+# License LGPL-3.0 or later (http://www.gnu.org/licenses/lgpl).
+
+from .common import LoanTestCase
+
+
+class TestInterestConsolidation(LoanTestCase):
+    def setUp(self):
+        super(TestInterestConsolidation, self).setUp()
+        self.loans = self.obj_loan.browse()
+        for _index in range(2):
+            loan = self._create_loan(period=3)
+            loan.action_compute_payment()
+            self.loans |= loan
+        self.schedules = self.loans.mapped("payment_schedule_ids")
+
+    def test_one_move_per_schedule(self):
+        self.schedules.action_realize_interest()
+        moves = self.schedules.mapped("interest_move_line_id.move_id")
+        self.assertEqual(len(moves), 6)
+
+    def test_one_move_per_date(self):
+        self.loan_type.write(
+            {
+                "interest_consolidation": True,
+            }
+        )
+        self.schedules.action_realize_interest()
+        moves = self.schedules.mapped("interest_move_line_id.move_id")
+        self.assertEqual(len(moves), 3)
+        for move in moves:
+            # A receivable and an income line for each loan
+            self.assertEqual(len(move.line_id), 4)
+            self.assertEqual(move.journal_id, self.seeder.journals["interest"])
+            self.assertAlmostEqual(
+                sum(move.line_id.mapped("debit")),
+                sum(move.line_id.mapped("credit")),
+            )
+        for schedule in self.schedules:
+            line = schedule.interest_move_line_id
+            self.assertEqual(line.date_maturity, schedule.schedule_date)
+            self.assertEqual(line.debit, schedule.interest_amount)
+            self.assertEqual(line.account_id, self.seeder.accounts["interest"])
+
+    def test_one_move_per_realization_date(self):
+        self.loan_type.write(
+            {
+                "interest_consolidation": True,
+            }
+        )
+        self.schedules.action_realize_interest(self.today.strftime("%Y-%m-%d"))
+        moves = self.schedules.mapped("interest_move_line_id.move_id")
+        self.assertEqual(len(moves), 1)
+        self.assertEqual(len(moves.line_id), 12)
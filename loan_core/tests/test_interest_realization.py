@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+# Copyright 2019 OpenSynergy Indonesia
+# License LGPL-3.0 or later (http://www.gnu.org/licenses/lgpl).
+
+from dateutil import relativedelta
+
+from openerp.exceptions import AccessError
+
+from .common import LoanTestCase
+
+
+class TestInterestRealization(LoanTestCase):
+    def setUp(self):
+        super(TestInterestRealization, self).setUp()
+        self.obj_schedule = self.env["loan.out_payment_schedule"]
+        self.obj_watermark = self.env["loan.interest_realization_watermark"]
+        self.run_date = self.today.strftime("%Y-%m-%d")
+        # Three schedules of every loan are due: two months ago, last
+        # month and today
+        self.loans = self.obj_loan.browse()
+        for _index in range(2):
+            loan = self._create_loan(
+                period=6,
+                first_payment_date=self.today - relativedelta.relativedelta(months=2),
+            )
+            self._activate_loan(loan)
+            self.loans |= loan
+        self.schedules = self.loans.mapped("payment_schedule_ids")
+        self.due_schedules = self.schedules.filtered(
+            lambda r: r.schedule_date <= self.run_date
+        )
+
+    def _realize(self, partition_count=1, partition_index=0):
+        self.obj_schedule.realize_interest_income(
+            commit=False,
+            partition_count=partition_count,
+            partition_index=partition_index,
+            company_ids=[self.company.id],
+        )
+        self.schedules.invalidate_cache()
+
+    def _get_watermark(self):
+        return self.obj_watermark._get_watermark(self.company, self.obj_schedule._name)
+
+    def test_realize_due_schedules(self):
+        self.assertEqual(self.loans.mapped("state"), ["active"])
+        self.assertEqual(len(self.due_schedules), 6)
+        self._realize()
+        for schedule in self.due_schedules:
+            self.assertTrue(schedule.interest_move_line_id)
+        for schedule in self.schedules - self.due_schedules:
+            self.assertFalse(schedule.interest_move_line_id)
+
+    def test_watermark(self):
+        self._realize()
+        watermark = self._get_watermark()
+        self.assertEqual(watermark.state, "done")
+        self.assertEqual(watermark.run_date, self.run_date)
+        self.assertEqual(watermark.failed_count, 0)
+        self.assertGreaterEqual(watermark.processed_count, len(self.due_schedules))
+        self.assertGreaterEqual(
+            watermark.schedule_date, max(self.due_schedules.mapped("schedule_date"))
+        )
+        self.assertEqual(self._get_watermark(), watermark)
+
+    def test_realize_twice(self):
+        self._realize()
+        move_lines = self.due_schedules.mapped("interest_move_line_id")
+        # Start over from the first schedule instead of resuming
+        watermark = self._get_watermark()
+        watermark.write(
+            {
+                "run_date": False,
+            }
+        )
+        self._realize()
+        self.assertEqual(self.due_schedules.mapped("interest_move_line_id"), move_lines)
+        self.assertEqual(watermark.processed_count, 0)
+
+    def test_watermark_read_only(self):
+        self._realize()
+        user = self._create_employee("loan_test_employee")
+        watermark = self._get_watermark().sudo(user)
+        self.assertEqual(watermark.run_date, self.run_date)
+        with self.assertRaises(AccessError):
+            watermark.write(
+                {
+                    "schedule_id": 0,
+                }
+            )
+
+    def test_partitions(self):
+        self._realize(2, 0)
+        realized = self.due_schedules.filtered(lambda r: r.interest_move_line_id)
+        self.assertTrue(realized)
+        self.assertTrue(all(schedule.id % 2 == 0 for schedule in realized))
+        self._realize(2, 1)
+        for schedule in self.due_schedules:
+            self.assertTrue(schedule.interest_move_line_id)
+        watermarks = self.obj_watermark.search(
+            [
+                ("company_id", "=", self.company.id),
+                ("model_name", "=", self.obj_schedule._name),
+                ("partition_count", "=", 2),
+            ]
+        )
+        self.assertEqual(sorted(watermarks.mapped("partition_index")), [0, 1])
+
+    def test_overlapping_partitions(self):
+        # A run with another partition count leaves nothing to realize
+        self._realize(2, 0)
+        move_lines = self.due_schedules.mapped("interest_move_line_id")
+        self._realize()
+        self._realize(2, 0)
+        for schedule in self.due_schedules:
+            self.assertTrue(schedule.interest_move_line_id)
+        self.assertTrue(
+            move_lines <= self.due_schedules.mapped("interest_move_line_id")
+        )
+        self.assertEqual(
+            len(self.due_schedules.mapped("interest_move_line_id")),
+            len(self.due_schedules),
+        )
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+# Copyright 2019 OpenSynergy Indonesia
+# License LGPL-3.0 or later (http://www.gnu.org/licenses/lgpl).
+
+from .common import LoanTestCase
+
+
+class TestLoanCompletion(LoanTestCase):
+    def setUp(self):
+        super(TestLoanCompletion, self).setUp()
+        self.loan = self._create_loan(period=2, loan_amount=400.0)
+        self._activate_loan(self.loan)
+        self.schedules = self.loan.payment_schedule_ids
+        self.schedules.action_realize_interest()
+        self.schedules.invalidate_cache()
+
+    def _pay_schedules(self, schedules):
+        lines = []
+        for schedule in schedules:
+            lines += [schedule.principle_move_line_id, schedule.interest_move_line_id]
+        self._pay(self.loan, lines)
+        self.loan.invalidate_cache()
+
+    def test_partial_payment_keeps_loan_active(self):
+        self.assertEqual(self.loan.outstanding_installment_count, 2)
+        self._pay_schedules(self.schedules[0])
+        self.assertEqual(self.loan.outstanding_installment_count, 1)
+        self.assertEqual(self.loan.state, "active")
+
+    def test_principle_only_keeps_loan_active(self):
+        self._pay(self.loan, self.schedules.mapped("principle_move_line_id"))
+        self.loan.invalidate_cache()
+        self.assertEqual(self.loan.outstanding_installment_count, 2)
+        self.assertEqual(self.loan.state, "active")
+
+    def test_full_payment_completes_loan(self):
+        self._pay_schedules(self.schedules[0])
+        self._pay_schedules(self.schedules[1])
+        self.assertEqual(self.loan.outstanding_installment_count, 0)
+        self.assertEqual(self.loan.state, "done")
+
+    def test_other_loan_not_completed(self):
+        other_loan = self._create_loan(period=2, loan_amount=400.0)
+        self._activate_loan(other_loan)
+        self._pay_schedules(self.schedules)
+        other_loan.invalidate_cache()
+        self.assertEqual(self.loan.state, "done")
+        self.assertEqual(other_loan.state, "active")
@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+# Copyright 2019 OpenSynergy Indonesia
+# License LGPL-3.0 or later (http://www.gnu.org/licenses/lgpl).
+
+import json
+
+import mock
+
+from openerp.exceptions import AccessError
+from openerp.exceptions import Warning as UserError
+
+from .common import LoanTestCase
+
+
+class TestLoanJob(LoanTestCase):
+    def setUp(self):
+        super(TestLoanJob, self).setUp()
+        self.obj_job = self.env["loan.job"]
+        self.company.write(
+            {
+                "loan_background_job": True,
+            }
+        )
+
+    def _get_jobs(self, loan):
+        return self.obj_job.search(
+            [
+                ("loan_model", "=", loan._name),
+                ("loan_id", "=", loan.id),
+            ]
+        )
+
+    def _process_jobs(self):
+        # Jobs commit every chunk, keep the test transaction instead
+        with mock.patch.object(self.cr.__class__, "commit"):
+            with mock.patch.object(self.cr.__class__, "rollback"):
+                self.obj_job.process_jobs()
+        self.env.invalidate_all()
+
+    def test_enqueue(self):
+        loan = self._create_loan(period=6)
+        loan.action_compute_payment()
+        job = self._get_jobs(loan)
+        self.assertEqual(len(job), 1)
+        self.assertEqual(job.state, "pending")
+        self.assertEqual(job.method, "action_compute_payment")
+        self.assertEqual(job.loan_state, "draft")
+        self.assertEqual(json.loads(job.res_ids), [loan.id])
+        self.assertEqual(loan.job_state, "pending")
+        self.assertFalse(loan.payment_schedule_ids)
+
+    def test_enqueue_merge(self):
+        loan = self._create_loan(period=6)
+        loan.action_compute_payment()
+        loan.action_compute_payment()
+        self.assertEqual(len(self._get_jobs(loan)), 1)
+
+    def test_process_jobs(self):
+        loan = self._create_loan(period=6)
+        loan.action_compute_payment()
+        self._process_jobs()
+        job = self._get_jobs(loan)
+        self.assertEqual(job.state, "done")
+        self.assertEqual(job.processed_count, 1)
+        self.assertEqual(len(loan.payment_schedule_ids), 6)
+        self.assertFalse(loan.job_state)
+
+    def test_skip_on_state_change(self):
+        loan = self._create_loan(period=6)
+        loan.action_compute_payment()
+        loan.workflow_action_confirm()
+        self._process_jobs()
+        job = self._get_jobs(loan)
+        self.assertEqual(job.state, "skipped")
+        self.assertEqual(job.processed_count, 0)
+        self.assertFalse(loan.payment_schedule_ids)
+
+    def test_no_enqueue_inside_job(self):
+        loan = self._create_loan(period=6)
+        loan = loan.with_context(loan_job_running=True)
+        self.assertFalse(loan._enqueue_job("action_compute_payment"))
+        loan.action_compute_payment()
+        self.assertFalse(self._get_jobs(loan))
+        self.assertEqual(len(loan.payment_schedule_ids), 6)
+
+    def test_no_enqueue_without_option(self):
+        self.company.write(
+            {
+                "loan_background_job": False,
+            }
+        )
+        loan = self._create_loan(period=6)
+        self.assertFalse(loan._enqueue_job("action_compute_payment"))
+
+    def test_enqueue_groups_records_by_loan(self):
+        loans = self._create_loan(period=6) | self._create_loan(period=3)
+        loans.with_context(loan_job_running=True).action_compute_payment()
+        schedules = loans.mapped("payment_schedule_ids")
+        loans._enqueue_job("action_long_to_short_term", schedules)
+        for loan in loans:
+            job = self._get_jobs(loan)
+            self.assertEqual(job.res_model, schedules._name)
+            self.assertEqual(
+                sorted(json.loads(job.res_ids)), sorted(loan.payment_schedule_ids.ids)
+            )
+
+    def test_enqueue_whitelist(self):
+        loan = self._create_loan(period=6)
+        with self.assertRaises(UserError):
+            self.obj_job._enqueue(loan, loan, "unlink")
+        with self.assertRaises(UserError):
+            self.obj_job._enqueue(loan, self.partner, "action_compute_payment")
+        self.assertFalse(self._get_jobs(loan))
+
+    def test_run_rejects_forged_job(self):
+        loan = self._create_loan(period=6)
+        job = self.obj_job.create(
+            {
+                "name": "Forged",
+                "loan_model": loan._name,
+                "loan_id": loan.id,
+                "res_model": loan._name,
+                "res_ids": json.dumps(loan.ids),
+                "method": "unlink",
+                "user_id": self.env.uid,
+            }
+        )
+        self._process_jobs()
+        self.assertEqual(job.state, "failed")
+        self.assertTrue(loan.exists())
+
+    def test_employee_enqueues_as_self(self):
+        user = self._create_employee("loan_test_job_employee")
+        loan = self._create_loan(period=6)
+        loan.sudo(user).action_compute_payment()
+        job = self._get_jobs(loan)
+        self.assertEqual(job.user_id, user)
+        job = job.sudo(user)
+        self.assertEqual(job.state, "pending")
+        with self.assertRaises(AccessError):
+            job.write(
+                {
+                    "user_id": self.env.uid,
+                }
+            )
+        with self.assertRaises(AccessError):
+            self.obj_job.sudo(user).create(
+                {
+                    "name": "Forged",
+                    "loan_model": loan._name,
+                    "loan_id": loan.id,
+                    "res_model": loan._name,
+                    "res_ids": json.dumps(loan.ids),
+                    "method": "action_compute_payment",
+                    "user_id": self.env.uid,
+                }
+            )
+
+    def _fail_job(self, job):
+        job.write(
+            {
+                "state": "failed",
+            }
+        )
+
+    def test_requeue_merges_into_pending_job(self):
+        loan = self._create_loan(period=6)
+        loan.action_compute_payment()
+        failed_job = self._get_jobs(loan)
+        self._fail_job(failed_job)
+        loan.action_compute_payment()
+        pending_job = self._get_jobs(loan) - failed_job
+        failed_job.action_requeue()
+        self.assertEqual(failed_job.state, "done")
+        self.assertEqual(pending_job.state, "pending")
+        self.assertEqual(json.loads(pending_job.res_ids), [loan.id])
+        self.assertEqual(loan.job_state, "pending")
+
+    def test_retry_merges_into_pending_job(self):
+        loan = self._create_loan(period=6)
+        loan.action_compute_payment()
+        running_job = self._get_jobs(loan)
+        running_job.write(
+            {
+                "state": "running",
+                "attempt_count": 1,
+            }
+        )
+        loan.action_compute_payment()
+        pending_job = self._get_jobs(loan) - running_job
+        running_job._retry_or_fail("Concurrent update")
+        self.assertEqual(running_job.state, "done")
+        self.assertEqual(pending_job.state, "pending")
+        self.assertEqual(loan.job_state, "pending")
+
+    def test_retry(self):
+        loan = self._create_loan(period=6)
+        loan.action_compute_payment()
+        job = self._get_jobs(loan)
+        job.write(
+            {
+                "state": "running",
+                "attempt_count": 1,
+            }
+        )
+        job._retry_or_fail("Concurrent update")
+        self.assertEqual(job.state, "pending")
+        self.assertTrue(job.eta)
+        self.assertEqual(job.error, "Concurrent update")
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+# Copyright 2019 OpenSynergy Indonesia
+# License LGPL-3.0 or later (http://www.gnu.org/licenses/lgpl).
+
+from .common import LoanTestCase
+
+
+class TestLoanTotal(LoanTestCase):
+    def test_totals(self):
+        loan = self._create_loan(period=6)
+        loan.action_compute_payment()
+        self.assertAlmostEqual(loan.total_principle_amount, 1200.0)
+        self.assertAlmostEqual(loan.total_interest_amount, 72.0)
+
+    def test_totals_of_several_loans(self):
+        loans = self._create_loan(period=6)
+        loans |= self._create_loan(period=3, loan_amount=600.0)
+        loans |= self._create_loan(period=6)
+        loans[:2].action_compute_payment()
+        totals = loans._get_schedule_totals()
+        self.assertEqual(len(totals), 2)
+        self.assertAlmostEqual(totals[loans[0].id][0], 1200.0)
+        self.assertAlmostEqual(totals[loans[0].id][1], 72.0)
+        self.assertAlmostEqual(totals[loans[1].id][0], 600.0)
+        self.assertAlmostEqual(totals[loans[1].id][1], 18.0)
+        self.assertEqual(loans[2].total_principle_amount, 0.0)
+
+    def test_totals_in_onchange(self):
+        loan = self.obj_loan.new(
+            {
+                "payment_schedule_ids": [
+                    (
+                        0,
+                        0,
+                        {
+                            "principle_amount": 100.0,
+                            "interest_amount": 1.0,
+                        },
+                    ),
+                    (
+                        0,
+                        0,
+                        {
+                            "principle_amount": 50.0,
+                            "interest_amount": 2.0,
+                        },
+                    ),
+                ],
+            }
+        )
+        self.assertAlmostEqual(loan.total_principle_amount, 150.0)
+        self.assertAlmostEqual(loan.total_interest_amount, 3.0)
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+# Copyright 2019 OpenSynergy Indonesia
+# License LGPL-3.0 or later (http://www.gnu.org/licenses/lgpl).
+
+from openerp.exceptions import AccessError
+
+from .common import LoanTestCase
+
+
+class TestMoveLineLink(LoanTestCase):
+    def setUp(self):
+        super(TestMoveLineLink, self).setUp()
+        self.obj_link = self.env["loan.move_line_link"]
+        self.loan = self._create_loan(period=6)
+        self._approve_loan(self.loan)
+
+    def test_realization_links(self):
+        self.assertEqual(
+            self.obj_link._get_move_lines(self.loan, "header"),
+            self.loan.move_line_header_id,
+        )
+        for schedule in self.loan.payment_schedule_ids:
+            self.assertEqual(
+                self.obj_link._get_move_lines(schedule, "principle"),
+                schedule.principle_move_line_id,
+            )
+
+    def test_interest_link(self):
+        schedule = self.loan.payment_schedule_ids[0]
+        schedule.action_realize_interest()
+        self.assertEqual(
+            self.obj_link._get_move_lines(schedule, "interest"),
+            schedule.interest_move_line_id,
+        )
+
+    def test_employee_reads_links(self):
+        user = self._create_employee("loan_test_link_employee")
+        links = self.obj_link.sudo(user).search(
+            [
+                ("res_model", "=", self.loan._name),
+                ("res_id", "=", self.loan.id),
+            ]
+        )
+        self.assertEqual(links.mapped("role"), ["header"])
+        with self.assertRaises(AccessError):
+            links.write(
+                {
+                    "role": "principle",
+                }
+            )
+        with self.assertRaises(AccessError):
+            self.obj_link.sudo(user).create(
+                {
+                    "move_line_id": self.loan.move_line_header_id.id,
+                    "res_model": self.loan._name,
+                    "res_id": self.loan.id,
+                    "role": "header",
+                }
+            )
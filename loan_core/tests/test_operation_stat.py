@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+# Copyright 2019 OpenSynergy Indonesia
+# License LGPL-3.0 or later (http://www.gnu.org/licenses/lgpl).
+
+from openerp.exceptions import AccessError
+
+from .common import LoanTestCase
+
+
+class TestOperationStat(LoanTestCase):
+    def setUp(self):
+        super(TestOperationStat, self).setUp()
+        self.obj_stat = self.env["loan.operation_stat"]
+        self.stat = {
+            "call_count": 1,
+            "record_count": 10,
+            "query_count": 20,
+            "rows_affected": 30,
+            "wall_time": 0.5,
+            "cache_miss_count": 40,
+        }
+        self.key = ("loan.out", "test_operation", self.loan_type.id)
+
+    def _get_stat(self):
+        return self.obj_stat.search(
+            [
+                ("res_model", "=", "loan.out"),
+                ("operation", "=", "test_operation"),
+            ]
+        )
+
+    def test_accumulate(self):
+        self.obj_stat._accumulate({self.key: self.stat})
+        self.obj_stat._accumulate({self.key: self.stat})
+        self.obj_stat.invalidate_cache()
+        stat = self._get_stat()
+        self.assertEqual(len(stat), 1)
+        self.assertEqual(stat.type_id, self.loan_type)
+        self.assertEqual(stat.call_count, 2)
+        self.assertEqual(stat.record_count, 20)
+        self.assertAlmostEqual(stat.average_wall_time, 0.5)
+        self.assertAlmostEqual(stat.average_query_count, 20.0)
+
+    def test_type_id(self):
+        loan = self._create_loan(period=6)
+        self.assertEqual(self.obj_stat._get_type_id(loan), self.loan_type.id)
+        self.assertEqual(self.obj_stat._get_type_id(self.partner), None)
+
+    def test_employee_reads_stats(self):
+        self.obj_stat._accumulate({self.key: self.stat})
+        self.obj_stat.invalidate_cache()
+        user = self._create_employee("loan_test_stat_employee")
+        stat = self._get_stat().sudo(user)
+        self.assertEqual(stat.call_count, 1)
+        with self.assertRaises(AccessError):
+            stat.write(
+                {
+                    "call_count": 0,
+                }
+            )
+        with self.assertRaises(AccessError):
+            stat.unlink()
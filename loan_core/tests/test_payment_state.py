@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+# Copyright 2019 OpenSynergy Indonesia
+# License LGPL-3.0 or later (http://www.gnu.org/licenses/lgpl).
+
+from .common import LoanTestCase
+
+
+class TestPaymentState(LoanTestCase):
+    def setUp(self):
+        super(TestPaymentState, self).setUp()
+        self.loan = self._create_loan(period=6)
+        self._activate_loan(self.loan)
+        self.schedules = self.loan.payment_schedule_ids
+        self.schedules[:2].action_realize_interest()
+        self.schedules.invalidate_cache()
+
+    def _pay_partial(self, line, amount):
+        period = self.env["account.period"]._find_loan_period(
+            self.today.strftime("%Y-%m-%d"), self.company
+        )
+        move = self.env["account.move"].create(
+            {
+                "journal_id": self.seeder.journals["payment"].id,
+                "period_id": period.id,
+                "date": self.today.strftime("%Y-%m-%d"),
+                "line_id": [
+                    (
+                        0,
+                        0,
+                        {
+                            "name": line.name,
+                            "account_id": line.account_id.id,
+                            "partner_id": line.partner_id.id,
+                            "credit": amount,
+                        },
+                    ),
+                    (
+                        0,
+                        0,
+                        {
+                            "name": line.name,
+                            "account_id": self.seeder.accounts["bank"].id,
+                            "debit": amount,
+                        },
+                    ),
+                ],
+            }
+        )
+        counterpart = move.line_id.filtered(lambda r: r.account_id == line.account_id)
+        (line | counterpart).reconcile_partial()
+        self.schedules.invalidate_cache()
+
+    def test_unpaid(self):
+        for schedule in self.schedules:
+            self.assertEqual(schedule.principle_payment_state, "unpaid")
+            self.assertEqual(schedule.interest_payment_state, "unpaid")
+
+    def test_paid(self):
+        schedule = self.schedules[0]
+        self._pay(
+            self.loan,
+            [schedule.principle_move_line_id, schedule.interest_move_line_id],
+        )
+        self.schedules.invalidate_cache()
+        self.assertEqual(schedule.principle_payment_state, "paid")
+        self.assertEqual(schedule.interest_payment_state, "paid")
+        for other_schedule in self.schedules - schedule:
+            self.assertEqual(other_schedule.principle_payment_state, "unpaid")
+
+    def test_partial(self):
+        schedule = self.schedules[1]
+        self._pay_partial(schedule.principle_move_line_id, 50.0)
+        self.assertEqual(schedule.principle_payment_state, "partial")
+        self.assertEqual(schedule.interest_payment_state, "unpaid")
+
+    def test_payment_states_query(self):
+        schedule = self.schedules[0]
+        self._pay(self.loan, [schedule.principle_move_line_id])
+        move_lines = self.schedules[:2].mapped("principle_move_line_id")
+        move_lines |= self.schedules[:2].mapped("interest_move_line_id")
+        states = self.env[self.schedules._name]._get_move_line_payment_states(
+            move_lines
+        )
+        self.assertEqual(states[schedule.principle_move_line_id.id], "paid")
+        self.assertEqual(states[schedule.interest_move_line_id.id], "unpaid")
+        self.assertEqual(len(states), 4)
@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+# Copyright 2019 OpenSynergy Indonesia
+# License LGPL-3.0 or later (http://www.gnu.org/licenses/lgpl).
+
+from openerp import SUPERUSER_ID
+
+from .common import LoanTestCase
+
+
+class TestPolicy(LoanTestCase):
+    def setUp(self):
+        super(TestPolicy, self).setUp()
+        self.group_ids = tuple(sorted(self.env.user.groups_id.ids))
+        self.superuser = self.env.uid == SUPERUSER_ID
+
+    def _get_policy_values(self, state="draft"):
+        return self.obj_loan._get_policy_values(
+            self.loan_type.id, state, self.group_ids, self.superuser
+        )
+
+    def test_policy_fields(self):
+        loan = self._create_loan(period=6)
+        values = dict(self._get_policy_values())
+        self.assertIn("confirm_ok", values)
+        for field_name, value in values.items():
+            self.assertEqual(loan[field_name], value)
+
+    def test_policy_values_cached(self):
+        values = self._get_policy_values()
+        self.assertIs(self._get_policy_values(), values)
+        self.assertIsNot(self._get_policy_values("confirm"), values)
+
+    def test_policy_write_clears_cache(self):
+        values = self._get_policy_values()
+        self.loan_type.write(
+            {
+                "loan_confirm_group_ids": [
+                    (6, 0, [self.env.ref("base.group_user").id])
+                ],
+            }
+        )
+        self.assertIsNot(self._get_policy_values(), values)
+
+    def test_other_write_keeps_cache(self):
+        values = self._get_policy_values()
+        self.loan_type.write(
+            {
+                "name": "Renamed Loan Type",
+            }
+        )
+        self.assertIs(self._get_policy_values(), values)
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+# Copyright 2019 OpenSynergy Indonesia
+# License LGPL-3.0 or later (http://www.gnu.org/licenses/lgpl).
+
+from datetime import timedelta
+
+from openerp import fields
+
+from .common import LoanTestCase
+
+
+class TestPrincipleAccount(LoanTestCase):
+    def setUp(self):
+        super(TestPrincipleAccount, self).setUp()
+        self.loan = self._create_loan(period=18, loan_amount=1800.0)
+        self.long_account = self.seeder.accounts["long_principle"]
+        self.short_account = self.seeder.accounts["short_principle"]
+
+    def test_boundary(self):
+        boundary = fields.Date.from_string(self.loan.date_realization) + timedelta(
+            days=365
+        )
+        self.assertEqual(
+            self.loan._get_principle_account_boundary(),
+            fields.Date.to_string(boundary),
+        )
+
+    def test_boundary_without_realization_date(self):
+        self.loan.write(
+            {
+                "date_realization": False,
+            }
+        )
+        boundary = self.today + timedelta(days=365)
+        self.assertEqual(
+            self.loan._get_principle_account_boundary(),
+            fields.Date.to_string(boundary),
+        )
+
+    def test_short_long_split(self):
+        self._approve_loan(self.loan)
+        boundary = self.loan._get_principle_account_boundary()
+        schedules = self.loan.payment_schedule_ids
+        short_schedules = schedules.filtered(lambda r: r.schedule_date <= boundary)
+        long_schedules = schedules - short_schedules
+        self.assertTrue(short_schedules)
+        self.assertTrue(long_schedules)
+        for schedule in short_schedules:
+            self.assertEqual(
+                schedule.principle_move_line_id.account_id, self.short_account
+            )
+        for schedule in long_schedules:
+            self.assertEqual(
+                schedule.principle_move_line_id.account_id, self.long_account
+            )
+
+    def test_schedule_account_matches_move(self):
+        self._approve_loan(self.loan)
+        for schedule in self.loan.payment_schedule_ids:
+            self.assertEqual(
+                schedule._get_realization_move_line_account(),
+                schedule.principle_move_line_id.account_id,
+            )
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+# Copyright 2019 OpenSynergy Indonesia
+# License LGPL-3.0 or later (http://www.gnu.org/licenses/lgpl).
+
+from .common import LoanTestCase
+
+
+class TestRealizationMove(LoanTestCase):
+    def _get_rounding_lines(self, loan):
+        account = self.seeder.accounts["rounding"]
+        return loan.move_realization_id.line_id.filtered(
+            lambda r: r.account_id == account
+        )
+
+    def _assert_balanced(self, loan):
+        lines = loan.move_realization_id.line_id
+        self.assertAlmostEqual(
+            sum(lines.mapped("debit")), sum(lines.mapped("credit")), places=6
+        )
+
+    def test_realization_move(self):
+        loan = self._create_loan(period=6)
+        self._approve_loan(loan)
+        lines = loan.move_realization_id.line_id
+        # Header, one principle line per schedule and no rounding line
+        self.assertEqual(len(lines), 7)
+        self.assertFalse(self._get_rounding_lines(loan))
+        self.assertEqual(loan.move_line_header_id.credit, 1200.0)
+        self.assertEqual(
+            loan.move_line_header_id.account_id, self.seeder.accounts["realization"]
+        )
+        self._assert_balanced(loan)
+
+    def test_rounding_line(self):
+        # 1200 / 7 is stored as 171.43, the principle lines add up to
+        # 1200.01 against a header of 1200.00
+        loan = self._create_loan(period=7)
+        self._approve_loan(loan)
+        rounding_line = self._get_rounding_lines(loan)
+        self.assertEqual(len(rounding_line), 1)
+        self.assertAlmostEqual(rounding_line.credit, 0.01, places=6)
+        self.assertEqual(rounding_line.debit, 0.0)
+        self._assert_balanced(loan)
+
+    def test_rounding_line_debit(self):
+        # 1000 / 3 is stored as 333.33, the principle lines add up to
+        # 999.99 against a header of 1000.00
+        loan = self._create_loan(period=3, loan_amount=1000.0)
+        self._approve_loan(loan)
+        rounding_line = self._get_rounding_lines(loan)
+        self.assertEqual(len(rounding_line), 1)
+        self.assertAlmostEqual(rounding_line.debit, 0.01, places=6)
+        self.assertEqual(rounding_line.credit, 0.0)
+        self._assert_balanced(loan)
+
+    def test_prepared_lines_rounded(self):
+        loan = self._create_loan(period=7)
+        loan.action_compute_payment()
+        for line_data in loan._prepare_realization_move_lines():
+            self.assertEqual(line_data["debit"], round(line_data["debit"], 2))
+            self.assertEqual(line_data["credit"], round(line_data["credit"], 2))
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+# Copyright 2019 OpenSynergy Indonesia
+# License LGPL-3.0 or later (http://www.gnu.org/licenses/lgpl).
+
+import json
+
+from openerp.exceptions import Warning as UserError
+
+from .common import LoanTestCase
+
+
+class TestRealizeInterestWizard(LoanTestCase):
+    def setUp(self):
+        super(TestRealizeInterestWizard, self).setUp()
+        self.loan = self._create_loan(period=6)
+        self._activate_loan(self.loan)
+        self.schedules = self.loan.payment_schedule_ids
+        self.schedules[:2].action_realize_interest()
+        self.schedules.invalidate_cache()
+
+    def _create_wizard(self, schedules):
+        return (
+            self.env["loan.realize_interest"]
+            .with_context(
+                active_model=schedules._name,
+                active_ids=schedules.ids,
+            )
+            .create({})
+        )
+
+    def test_realize(self):
+        wizard = self._create_wizard(self.schedules)
+        wizard.action_realize()
+        self.assertEqual(wizard.state, "done")
+        self.assertEqual(wizard.realized_count, 4)
+        self.assertEqual(wizard.skipped_count, 2)
+        self.assertEqual(wizard.failed_count, 0)
+        self.schedules.invalidate_cache()
+        for schedule in self.schedules:
+            self.assertTrue(schedule.interest_move_line_id)
+        self.assertEqual(
+            wizard.move_ids,
+            self.schedules[2:].mapped("interest_move_line_id.move_id"),
+        )
+
+    def test_realize_nothing_selected(self):
+        wizard = self._create_wizard(self.schedules.browse())
+        with self.assertRaises(UserError):
+            wizard.action_realize()
+
+    def test_realize_in_background(self):
+        self.company.write(
+            {
+                "loan_background_job": True,
+            }
+        )
+        wizard = self._create_wizard(self.schedules)
+        wizard.action_realize()
+        self.assertEqual(wizard.state, "queued")
+        job = self.env["loan.job"].search(
+            [
+                ("loan_model", "=", self.loan._name),
+                ("loan_id", "=", self.loan.id),
+                ("method", "=", "_realize_interest_selection"),
+            ]
+        )
+        self.assertEqual(len(job), 1)
+        self.assertEqual(json.loads(job.res_ids), self.schedules.ids)
+        kwargs = json.loads(job.kwargs)
+        self.assertEqual(kwargs["date_realization"], wizard.date_realization)
+        self.assertTrue(kwargs["raise_on_failure"])
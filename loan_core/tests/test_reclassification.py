@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+# Copyright 2019 OpenSynergy Indonesia
+# License LGPL-3.0 or later (http://www.gnu.org/licenses/lgpl).
+
+from dateutil import relativedelta
+
+from .common import LoanTestCase
+
+
+class TestReclassification(LoanTestCase):
+    def setUp(self):
+        super(TestReclassification, self).setUp()
+        self.obj_schedule = self.env["loan.out_payment_schedule"]
+        self.loans = self.obj_loan.browse()
+        for _index in range(2):
+            loan = self._create_loan(period=18, loan_amount=1800.0)
+            self._activate_loan(loan)
+            self.loans |= loan
+        self.schedules = self.loans.mapped("payment_schedule_ids")
+        self.long_account = self.seeder.accounts["long_principle"]
+        self.short_account = self.seeder.accounts["short_principle"]
+        self.long_schedules = self.schedules.filtered(
+            lambda r: r.principle_move_line_id.account_id == self.long_account
+        )
+
+    def _reclassify(self, date):
+        self.obj_schedule.reclassify_long_to_short_term(
+            commit=False,
+            date=date.strftime("%Y-%m-%d"),
+        )
+        self.schedules.invalidate_cache()
+
+    def test_nothing_due_today(self):
+        self.assertTrue(self.long_schedules)
+        self._reclassify(self.today)
+        for schedule in self.long_schedules:
+            self.assertEqual(
+                schedule.principle_move_line_id.account_id, self.long_account
+            )
+            self.assertFalse(schedule.old_principle_move_line_id)
+
+    def test_reclassify(self):
+        self._reclassify(self.today + relativedelta.relativedelta(months=7))
+        obj_link = self.env["loan.move_line_link"]
+        for schedule in self.long_schedules:
+            old_line = schedule.old_principle_move_line_id
+            self.assertEqual(old_line.account_id, self.long_account)
+            self.assertEqual(
+                schedule.principle_move_line_id.account_id, self.short_account
+            )
+            self.assertEqual(
+                obj_link._get_move_lines(schedule, "old_principle"), old_line
+            )
+            long_line = obj_link._get_move_lines(schedule, "long_term")
+            self.assertTrue(old_line.reconcile_id)
+            self.assertEqual(long_line.reconcile_id, old_line.reconcile_id)
+
+    def test_reconcile_in_one_batch(self):
+        self._reclassify(self.today + relativedelta.relativedelta(months=7))
+        old_lines = self.long_schedules.mapped("old_principle_move_line_id")
+        # Both loans share the partner and the long-term account
+        self.assertEqual(len(old_lines.mapped("reconcile_id")), 1)
+
+    def test_reclassify_once(self):
+        date = self.today + relativedelta.relativedelta(months=7)
+        self._reclassify(date)
+        principle_lines = self.long_schedules.mapped("principle_move_line_id")
+        self._reclassify(date)
+        self.assertEqual(
+            self.long_schedules.mapped("principle_move_line_id"), principle_lines
+        )
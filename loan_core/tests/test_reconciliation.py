@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+# Copyright 2019 OpenSynergy Indonesia
+# License LGPL-3.0 or later (http://www.gnu.org/licenses/lgpl).
+
+import mock
+
+from .common import LoanTestCase
+
+
+class TestReconciliation(LoanTestCase):
+    def test_realization_reconcile_activates_loan(self):
+        loan = self._create_loan(period=6)
+        self._approve_loan(loan)
+        self.assertEqual(loan.state, "approve")
+        self.assertTrue(loan.move_line_header_id)
+        self._pay(loan, [loan.move_line_header_id])
+        loan.invalidate_cache()
+        self.assertEqual(loan.state, "active")
+
+    def test_unrelated_reconcile_keeps_state(self):
+        loan = self._create_loan(period=6)
+        self._approve_loan(loan)
+        other_loan = self._create_loan(period=6)
+        self._approve_loan(other_loan)
+        self._pay(other_loan, [other_loan.move_line_header_id])
+        loan.invalidate_cache()
+        self.assertEqual(loan.state, "approve")
+        self.assertEqual(other_loan.state, "active")
+
+    def test_write_without_reconcile_skips_hook(self):
+        loan = self._create_loan(period=6)
+        self._approve_loan(loan)
+        obj_move_line = self.env["account.move.line"]
+        with mock.patch.object(
+            obj_move_line.__class__, "_update_loan_from_reconciliation"
+        ) as hook:
+            loan.move_line_header_id.write(
+                {
+                    "name": "Renamed",
+                }
+            )
+            self.assertFalse(hook.called)
@@ -19,6 +19,35 @@ class RealizeInterst(models.TransientModel):
         default=datetime.now().strftime("%Y-%m-%d"),
     )
 
+    state = fields.Selection(
+        string="State",
+        selection=[
+            ("draft", "Draft"),
+            ("queued", "Queued"),
+            ("done", "Done"),
+        ],
+        default="draft",
+        readonly=True,
+    )
+    move_ids = fields.Many2many(
+        string="Journal Entries",
+        comodel_name="account.move",
+        readonly=True,
+    )
+    realized_count = fields.Integer(
+        string="Realized Schedules",
+        readonly=True,
+    )
+    skipped_count = fields.Integer(
+        string="Skipped Schedules",
+        readonly=True,
+        help="Schedules whose interest was already realized",
+    )
+    failed_count = fields.Integer(
+        string="Failed Schedules",
+        readonly=True,
+    )
+
     @api.multi
     def action_realize(self):
         self.ensure_one()
@@ -28,5 +57,42 @@ class RealizeInterst(models.TransientModel):
         if not schedule_ids or len(schedule_ids) == 0:
             strWarning = _("No loan repayment schedule selected")
             raise UserError(strWarning)
-        for schedule in obj_schedule.browse(schedule_ids):
-            schedule.action_realize_interest(self.date_realization)
+        schedules = obj_schedule.browse(schedule_ids)
+        loans = schedules.mapped("loan_id")
+        if loans._enqueue_job(
+            "_realize_interest_selection",
+            schedules,
+            date_realization=self.date_realization,
+            commit=True,
+            raise_on_failure=True,
+        ):
+            self.write(
+                {
+                    "state": "queued",
+                }
+            )
+            return self._reopen()
+        summary = schedules._realize_interest_selection(self.date_realization)
+        self.write(
+            {
+                "state": "done",
+                "move_ids": [(6, 0, summary["move_ids"])],
+                "realized_count": summary["realized_count"],
+                "skipped_count": summary["skipped_count"],
+                "failed_count": summary["failed_count"],
+            }
+        )
+        return self._reopen()
+
+    @api.multi
+    def _reopen(self):
+        self.ensure_one()
+        return {
+            "type": "ir.actions.act_window",
+            "name": _("Realize Interest"),
+            "res_model": self._name,
+            "res_id": self.id,
+            "view_type": "form",
+            "view_mode": "form",
+            "target": "new",
+        }
@@ -14,6 +14,14 @@ class LoanSelectRealizationEntry(models.TransientModel):
         comodel_name="account.move.line",
     )
 
+    @api.onchange("loan_id")
+    def onchange_move_line_ids(self):
+        # Same criteria as the loan's allowed_move_line_ids
+        domain = [("id", "=", 0)]
+        if self.loan_id:
+            domain = self.loan_id._prepare_criteria_move_line()
+        return {"domain": {"move_line_ids": domain}}
+
     @api.multi
     def get_loan(self):
         active_model = self.env.context.get("active_model", False)